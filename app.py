@@ -1,7 +1,7 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
-from typing import List
 
 import numpy as np
 import streamlit as st
@@ -15,27 +15,117 @@ if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
 from rl_project.envs import GridWorldEnv
-from rl_project.agents import QLearningAgent, QLearningConfig
+from rl_project.agents import QLearningAgent, QLearningConfig, evaluate_policy
+from rl_project.agents.checkpoint import load_checkpoint, save_checkpoint
 from rl_project.hitl.feedback_manager import FeedbackManager, FeedbackConfig
+from training.background import BackgroundTrainer
+from training.train_q_learning import DEFAULT_MAX_EPISODE_STEPS
+
+
+CHECKPOINT_PATH = Path(os.environ.get("RL_CHECKPOINT", "data/checkpoints/gridworld_agent.qckpt"))
 
 
 @st.cache_resource
 def get_env_and_agent():
-    env = GridWorldEnv()
-    agent = QLearningAgent(env.observation_space.n, env.action_space.n, QLearningConfig())
-    feedback = FeedbackManager(FeedbackConfig(file_path=Path("data/feedback/gridworld_feedback.json")))
+    env = GridWorldEnv(max_episode_steps=DEFAULT_MAX_EPISODE_STEPS)
+    if CHECKPOINT_PATH.exists():
+        # warm start: map the saved table copy-on-write, so training here never touches the file
+        agent = load_checkpoint(CHECKPOINT_PATH, mode="c")
+    else:
+        # Q-table storage backend: dense (default), blocked or hash
+        agent = QLearningAgent(env.observation_space.n, env.action_space.n,
+                               QLearningConfig(q_backend=os.environ.get("RL_Q_BACKEND", "dense")))
+    feedback = FeedbackManager(FeedbackConfig(
+        file_path=Path("data/feedback/gridworld_feedback.json"),
+        # share feedback across app processes through scripts/feedback_server.py
+        server_address=os.environ.get("RL_FEEDBACK_SERVER"),
+    ))
     return env, agent, feedback
 
 
+@st.cache_resource
+def get_trainer() -> BackgroundTrainer:
+    # one worker per app process, shared by all sessions like the agent it trains
+    env, agent, feedback = get_env_and_agent()
+    return BackgroundTrainer(env, agent, feedback)
+
+
+# Streamlit >= 1.37 has `st.fragment`; 1.33-1.36 only the experimental name
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
 def run_one_step(env: GridWorldEnv, agent: QLearningAgent, state: int, use_feedback: bool, feedback_mgr: FeedbackManager):
     action = agent.select_action(state)
     next_state, reward, terminated, truncated, _ = env.step(action)
     if use_feedback:
-        reward = feedback_mgr.shaped_reward(reward, state, action)
-    agent.update(state, action, reward, next_state, terminated or truncated)
+        reward += feedback_mgr.shaping_matrix(agent.num_states, agent.num_actions).item(state, action)
+    agent.update(state, action, reward, next_state, terminated)  # truncation still bootstraps
     return action, next_state, reward, terminated or truncated
 
 
+def draw_policy(policy: np.ndarray):
+    fig, ax = plt.subplots(figsize=(3, 3))
+    ax.imshow(policy, cmap="Accent", vmin=0, vmax=3)
+    ax.set_title("Greedy Policy (0=上,1=下,2=左,3=右)")
+    return fig
+
+
+def draw_returns_chart(trainer: BackgroundTrainer, chart_slot) -> None:
+    """(Re)draw the returns chart in `chart_slot` from the whole ring buffer."""
+    ss = st.session_state
+    returns, ss.train_cursor = trainer.returns_since(0)
+    ss.train_chart = chart_slot.line_chart(returns) if returns.size else None
+
+
+def training_progress(trainer: BackgroundTrainer, chart_slot, poll: bool):
+    """Render the background run; only returns and snapshots not seen yet are processed.
+
+    The returns chart lives in `chart_slot`, outside the polling fragment: a
+    poll appends just the new returns with `add_rows`, and the chart is only
+    rebuilt from the ring buffer after the buffer wrapped around.
+    """
+    ss = st.session_state
+    if "policy_version" not in ss:
+        ss.policy_version = 0
+        ss.policy_fig = None
+        ss.policy_eval = None
+    if poll:
+        new, cursor = trainer.returns_since(ss.train_cursor)
+        if new.size:
+            if ss.train_chart is None or cursor // trainer.capacity != ss.train_cursor // trainer.capacity:
+                draw_returns_chart(trainer, chart_slot)
+            else:
+                ss.train_chart.add_rows(new)
+                ss.train_cursor = cursor
+
+    p = trainer.progress()
+    st.progress(min(p["fraction"], 1.0),
+                text=f"{p['state']}：{p['episodes_done']}/{p['episodes_total']} 回合，{p['episodes_per_s']:.0f} 回合/秒")
+    recent = trainer.recent_returns(50)
+    if recent.size:
+        st.caption(f"最近50回合平均回报：{recent.mean():.2f}")
+
+    version, q = trainer.snapshot()
+    if q is not None and version != ss.policy_version:
+        # redraw the policy only when the worker published a new Q-table snapshot
+        if ss.policy_fig is not None:
+            plt.close(ss.policy_fig)
+        ss.policy_fig = draw_policy(q.argmax(axis=1).reshape(trainer.env.grid.height, trainer.env.grid.width))
+        ss.policy_eval = evaluate_policy(trainer.env, q)
+        ss.policy_version = version
+    if ss.policy_fig is not None:
+        st.caption(f"贪心策略评估（所有起点）：{ss.policy_eval.summary()}")
+        st.pyplot(ss.policy_fig)
+
+    if p["error"]:
+        st.error(f"训练出错：{p['error']}")
+    if not trainer.running and trainer.profiler is not None and trainer.profiler.elapsed is not None:
+        st.bar_chart({name: d["total_s"] for name, d in trainer.profiler.to_dict()["phases"].items()})
+        st.code(trainer.profiler.report())
+    if poll and not trainer.running:
+        st.rerun()  # run finished: refresh the whole page once so the controls and polling switch off
+
+
 def draw_grid(env: GridWorldEnv):
     arr = env.as_array()
     fig, ax = plt.subplots(figsize=(1, 1))
@@ -49,6 +139,7 @@ def draw_grid(env: GridWorldEnv):
 
 def main():
     env, agent, feedback_mgr = get_env_and_agent()
+    trainer = get_trainer()
     use_feedback = st.sidebar.checkbox("启用人类反馈奖励塑形", value=True)
     draw_grid(env)
 
@@ -63,7 +154,8 @@ def main():
     col1, col2, col3 = st.columns(3)
     with col1:
         if st.button("执行一步") and not st.session_state.done:
-            a, s2, r, d = run_one_step(env, agent, st.session_state.state, use_feedback, feedback_mgr)
+            with trainer.lock:  # don't interleave with a background episode
+                a, s2, r, d = run_one_step(env, agent, st.session_state.state, use_feedback, feedback_mgr)
             st.session_state.last_action = a
             st.session_state.state = s2
             st.session_state.done = d
@@ -89,33 +181,51 @@ def main():
     # Training
     st.subheader("训练")
     episodes = st.number_input("训练回合数", min_value=10, max_value=5000, value=200, step=10)
-    if st.button("训练若干回合"):
-        returns: List[float] = []
-        for _ in range(int(episodes)):
-            s, _ = env.reset()
-            done = False
-            ep_ret = 0.0
-            while not done:
-                a = agent.select_action(s)
-                s2, r, term, trunc, _ = env.step(a)
-                if use_feedback:
-                    r = feedback_mgr.shaped_reward(r, s, a)
-                agent.update(s, a, r, s2, term or trunc)
-                ep_ret += r
-                s = s2
-                done = term or trunc
-            returns.append(ep_ret)
-        st.line_chart(returns)
-        st.success(f"训练完成，最近50回合平均回报：{np.mean(returns[-50:]) if len(returns)>=50 else np.mean(returns):.2f}")
+    profile = st.checkbox("性能分析（各阶段耗时）", value=False)
+    tcol1, tcol2, tcol3 = st.columns(3)
+    with tcol1:
+        if st.button("训练若干回合", disabled=trainer.running):
+            trainer.start(int(episodes), use_feedback=use_feedback, profile=profile)
+    with tcol2:
+        if trainer.state == "paused":
+            if st.button("继续"):
+                trainer.resume()
+        elif st.button("暂停", disabled=not trainer.running):
+            trainer.pause()
+    with tcol3:
+        if st.button("取消", disabled=not trainer.running):
+            trainer.cancel()
+            trainer.join(timeout=5.0)
+    # poll the worker while it runs; the rest of the page is not re-executed
+    chart_slot = st.empty()
+    draw_returns_chart(trainer, chart_slot)  # a full page run redraws it once; polls only append
+    if _fragment is not None and trainer.running:
+        _fragment(run_every=1.0)(training_progress)(trainer, chart_slot, poll=True)
+    else:
+        training_progress(trainer, chart_slot, poll=False)
+        if trainer.running:
+            st.button("刷新进度")  # without fragments, any interaction reruns the page with the latest progress
+    if st.button("保存检查点"):
+        with trainer.lock:
+            save_checkpoint(agent, CHECKPOINT_PATH)
+        st.success(f"已保存到 {CHECKPOINT_PATH}（下次启动自动加载）")
 
     # Evaluation
     st.subheader("评估与可视化")
+    if st.button("评估贪心策略（所有起点）"):
+        with trainer.lock:
+            report = evaluate_policy(env, agent)
+        mcol1, mcol2, mcol3, mcol4 = st.columns(4)
+        mcol1.metric("成功率", f"{report.success_rate:.1%}")
+        mcol2.metric("路径长度 / 最短路", f"{report.path_ratio:.2f}")
+        mcol3.metric("平均碰撞次数", f"{report.collisions_per_episode:.2f}")
+        mcol4.metric("陷入循环", f"{report.loops} / {report.num_episodes}")
     if st.button("显示当前策略 Q 值最大动作图"):
-        policy = np.argmax(agent.q_table, axis=1).reshape(env.grid.height, env.grid.width)
-        fig, ax = plt.subplots(figsize=(3, 3))
-        ax.imshow(policy, cmap="Accent", vmin=0, vmax=3)
-        ax.set_title("Greedy Policy (0=上,1=下,2=左,3=右)")
-        st.pyplot(fig)
+        with trainer.lock:
+            policy = agent.greedy_actions(np.arange(agent.num_states)).reshape(env.grid.height, env.grid.width)
+            mem = agent.memory_usage()
+        st.pyplot(draw_policy(policy))
+        st.caption(f"Q 表存储：{mem['backend']}，{mem['bytes'] / 1024:.1f} KiB（稠密表的 {mem['fraction_of_dense']:.0%}）")
 
 
 if __name__ == "__main__":
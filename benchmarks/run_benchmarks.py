@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Ensure project root on sys.path for direct script execution
+import sys
+from pathlib import Path as _Path
+_project_root = str(_Path(__file__).resolve().parents[1])
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from rl_project.envs import GridSpec, GridWorldEnv, VectorGridWorldEnv, validate_layout
+from rl_project.agents import QLearningAgent, QLearningConfig
+from rl_project.datasets import TrajectoryReader, TrajectoryWriter
+from rl_project.hitl.feedback_manager import FeedbackManager, FeedbackConfig
+from training.train_q_learning import run_episode, run_parallel_training
+
+
+RESULTS_FORMAT = "rl-benchmarks"
+RESULTS_VERSION = 1
+
+# A benchmark case: `setup(params)` builds everything untimed and returns `run()`,
+# which does one timed unit of work and returns how many items it processed.
+Setup = Callable[[Dict], Callable[[], float]]
+
+_TRANSITION_BYTES = 4 + 1 + 4 + 4 + 1  # columnar on-disk size of one transition
+
+
+@dataclass
+class Benchmark:
+    name: str
+    unit: str  # throughput unit, e.g. "steps/s"
+    setup: Setup
+    params: Dict[str, List]  # parameter grid, expanded as a cartesian product
+
+
+@dataclass
+class Result:
+    name: str
+    params: Dict
+    unit: str
+    throughput: float  # best of `repeats` runs
+    seconds: float  # duration of the best run
+    peak_mb: float  # tracemalloc peak over setup + one run (this process only)
+
+    @property
+    def key(self) -> str:
+        return self.name + "[" + ",".join(f"{k}={v}" for k, v in sorted(self.params.items())) + "]"
+
+
+def random_grid(size: int, density: float, seed: int = 0) -> GridSpec:
+    """`size`x`size` layout with a fraction `density` of obstacle cells.
+
+    Start and goal are opposite corners; seeds are tried in turn until the goal
+    is reachable, so episodes always terminate.
+    """
+    while True:
+        occupancy = np.random.default_rng(seed).random((size, size)) < density
+        occupancy[0, 0] = occupancy[-1, -1] = False
+        spec = GridSpec.from_occupancy(occupancy, (0, 0), (size - 1, size - 1))
+        try:
+            validate_layout(spec)
+            return spec
+        except ValueError:
+            seed += 1
+
+
+# --- benchmark cases -------------------------------------------------------
+
+def setup_env_step(p: Dict) -> Callable[[], float]:
+    env = GridWorldEnv(random_grid(p["grid_size"], p["density"]))
+    actions = np.random.default_rng(0).integers(0, 4, 20_000).tolist()
+    env.reset()
+
+    def run() -> float:
+        for a in actions:
+            _, _, terminated, truncated, _ = env.step(a)
+            if terminated or truncated:
+                env.reset()
+        return len(actions)
+    return run
+
+
+def setup_vector_env_step(p: Dict) -> Callable[[], float]:
+    env = VectorGridWorldEnv(p["batch_size"], random_grid(p["grid_size"], p["density"]))
+    actions = np.random.default_rng(0).integers(0, 4, (50, p["batch_size"]))
+    env.reset()
+
+    def run() -> float:
+        for a in actions:
+            env.step(a)
+        return actions.size
+    return run
+
+
+def setup_agent_update(p: Dict) -> Callable[[], float]:
+    num_states = p["grid_size"] ** 2
+    agent = QLearningAgent(num_states, 4, QLearningConfig(q_backend=p["backend"]))
+    rng = np.random.default_rng(0)
+    n = 20_000
+    s, a, s2 = rng.integers(0, num_states, n).tolist(), rng.integers(0, 4, n).tolist(), rng.integers(0, num_states, n).tolist()
+    r = rng.normal(size=n).tolist()
+
+    def run() -> float:
+        for i in range(n):
+            agent.update(s[i], a[i], r[i], s2[i], False)
+        return n
+    return run
+
+
+def setup_agent_update_batch(p: Dict) -> Callable[[], float]:
+    num_states = p["grid_size"] ** 2
+    agent = QLearningAgent(num_states, 4, QLearningConfig(q_backend=p["backend"]))
+    rng = np.random.default_rng(0)
+    batches = [
+        (rng.integers(0, num_states, p["batch_size"]), rng.integers(0, 4, p["batch_size"]),
+         rng.normal(size=p["batch_size"]), rng.integers(0, num_states, p["batch_size"]),
+         np.zeros(p["batch_size"], dtype=bool))
+        for _ in range(max(1, 200_000 // p["batch_size"]))
+    ]
+
+    def run() -> float:
+        for batch in batches:
+            agent.update_batch(*batch)
+        return len(batches) * p["batch_size"]
+    return run
+
+
+def setup_episodes(p: Dict) -> Callable[[], float]:
+    env = GridWorldEnv(random_grid(p["grid_size"], p["density"]))
+    agent = QLearningAgent(env.observation_space.n, env.action_space.n)
+    np.random.seed(0)
+    for _ in range(20):  # warm up past the first, very long random episodes
+        state, _ = env.reset()
+        run_episode(env, agent, state)
+
+    def run() -> float:
+        for _ in range(50):
+            state, _ = env.reset()
+            run_episode(env, agent, state)
+        return 50
+    return run
+
+
+def setup_shaped_reward(p: Dict, tmp: Path) -> Callable[[], float]:
+    mgr = FeedbackManager(FeedbackConfig(file_path=tmp / "feedback.json"))
+    num_states = p["grid_size"] ** 2
+    rng = np.random.default_rng(0)
+    mgr.add_feedback(0, 1, 1)
+    states, actions = rng.integers(0, num_states, 20_000), rng.integers(0, 4, 20_000)
+    mgr.shaping_matrix(num_states, 4)
+    pairs = list(zip(states.tolist(), actions.tolist()))
+
+    def run() -> float:
+        if p["batch_size"] == 1:
+            for s, a in pairs:
+                mgr.shaped_reward(-1.0, s, a)
+        else:
+            rewards = np.full(p["batch_size"], -1.0)
+            for start in range(0, states.size, p["batch_size"]):
+                end = start + p["batch_size"]
+                mgr.shaped_rewards(rewards[:states[start:end].size], states[start:end], actions[start:end])
+        return states.size
+    return run
+
+
+def setup_dataset_write(p: Dict, tmp: Path) -> Callable[[], float]:
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    columns = (rng.integers(0, 10_000, n), rng.integers(0, 4, n), rng.normal(size=n), rng.integers(0, 10_000, n),
+               np.zeros(n, dtype=bool))
+    episode = p["batch_size"]
+
+    def run() -> float:
+        out = tmp / "write"
+        shutil.rmtree(out, ignore_errors=True)
+        with TrajectoryWriter(out) as writer:
+            for start in range(0, n, episode):
+                writer.add_episode(*(c[start:start + episode] for c in columns))
+        return n * _TRANSITION_BYTES / 1e6
+    return run
+
+
+def setup_dataset_read(p: Dict, tmp: Path) -> Callable[[], float]:
+    n = 1_000_000
+    out = tmp / "read"
+    rng = np.random.default_rng(0)
+    with TrajectoryWriter(out) as writer:
+        writer.add_episode(rng.integers(0, 10_000, n), rng.integers(0, 4, n), rng.normal(size=n),
+                           rng.integers(0, 10_000, n), np.zeros(n, dtype=bool))
+    reader = TrajectoryReader(out)
+
+    def run() -> float:
+        for _ in reader.iter_minibatches(p["batch_size"], shuffle=True, seed=0):
+            pass
+        return n * _TRANSITION_BYTES / 1e6
+    return run
+
+
+def setup_parallel_training(p: Dict) -> Callable[[], float]:
+    def run() -> float:
+        run_parallel_training(100, False, 0, p["workers"])
+        return 100 * p["workers"]
+    return run
+
+
+def build_suite(args) -> List[Benchmark]:
+    sizes, densities = args.grid_sizes, args.densities
+    return [
+        Benchmark("env_step", "steps/s", setup_env_step, {"grid_size": sizes, "density": densities}),
+        Benchmark("vector_env_step", "steps/s", setup_vector_env_step,
+                  {"grid_size": sizes, "density": densities[:1], "batch_size": args.batch_sizes}),
+        Benchmark("agent_update", "updates/s", setup_agent_update, {"grid_size": sizes, "backend": args.backends}),
+        Benchmark("agent_update_batch", "updates/s", setup_agent_update_batch,
+                  {"grid_size": sizes, "backend": args.backends, "batch_size": args.batch_sizes}),
+        Benchmark("episodes", "episodes/s", setup_episodes, {"grid_size": [5, 10], "density": densities}),
+        Benchmark("shaped_reward", "rewards/s", _with_tmp(setup_shaped_reward),
+                  {"grid_size": sizes, "batch_size": [1, *args.batch_sizes]}),
+        Benchmark("dataset_write", "MB/s", _with_tmp(setup_dataset_write), {"batch_size": args.batch_sizes}),
+        Benchmark("dataset_read", "MB/s", _with_tmp(setup_dataset_read), {"batch_size": args.batch_sizes}),
+        Benchmark("parallel_training", "episodes/s", setup_parallel_training, {"workers": args.workers}),
+    ]
+
+
+_TMP_DIRS: List[Path] = []
+
+
+def _with_tmp(setup: Callable[[Dict, Path], Callable[[], float]]) -> Setup:
+    """Give a setup function its own scratch directory (removed at exit)."""
+    def wrapped(p: Dict) -> Callable[[], float]:
+        tmp = Path(tempfile.mkdtemp(prefix="rl-bench-"))
+        _TMP_DIRS.append(tmp)
+        return setup(p, tmp)
+    return wrapped
+
+
+# --- running and comparing -------------------------------------------------
+
+def expand(params: Dict[str, List]) -> List[Dict]:
+    keys = list(params)
+    return [dict(zip(keys, values)) for values in itertools.product(*(params[k] for k in keys))]
+
+
+def run_case(bench: Benchmark, params: Dict, repeats: int) -> Result:
+    """Time `repeats` runs (best one wins), then measure peak memory in a separate traced run."""
+    run = bench.setup(params)
+    run()  # warm-up: caches, page faults, lazy allocation
+    best_time, items = float("inf"), 0.0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        n = run()
+        elapsed = time.perf_counter() - t0
+        if elapsed < best_time:
+            best_time, items = elapsed, n
+    del run
+
+    # tracemalloc slows Python-level code, so it is kept out of the timed runs
+    tracemalloc.start()
+    try:
+        bench.setup(params)()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(bench.name, params, bench.unit, items / best_time, best_time, peak / 1e6)
+
+
+def run_suite(suite: List[Benchmark], repeats: int, name_filter: Optional[str] = None) -> List[Result]:
+    results = []
+    for bench in suite:
+        if name_filter and name_filter not in bench.name:
+            continue
+        for params in expand(bench.params):
+            result = run_case(bench, params, repeats)
+            print(f"{result.key:<70} {result.throughput:>14,.1f} {result.unit:<11} peak {result.peak_mb:8.1f} MB")
+            results.append(result)
+    return results
+
+
+def write_results(results: List[Result], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = {
+        "format": RESULTS_FORMAT,
+        "version": RESULTS_VERSION,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": [{**asdict(r), "key": r.key} for r in results],
+    }
+    path.write_text(json.dumps(doc, indent=2))
+
+
+def load_results(path: Path) -> Dict[str, Dict]:
+    doc = json.loads(Path(path).read_text())
+    if doc.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path} is not a benchmark results file")
+    return {r["key"]: r for r in doc["results"]}
+
+
+def compare(results: List[Result], baseline: Dict[str, Dict], threshold: float) -> List[Tuple[str, str]]:
+    """Return `(key, message)` for every case that regressed by more than `threshold`.
+
+    Throughput regresses when it falls below `(1 - threshold)` of the baseline,
+    peak memory when it grows beyond `(1 + threshold)` of it. Cases missing
+    from the baseline are reported but never fail.
+    """
+    regressions = []
+    for r in results:
+        base = baseline.get(r.key)
+        if base is None:
+            print(f"  new      {r.key}")
+            continue
+        speed = r.throughput / base["throughput"] if base["throughput"] else float("inf")
+        memory = r.peak_mb / base["peak_mb"] if base["peak_mb"] > 0.1 else 1.0  # ignore tiny peaks
+        status = "ok"
+        if speed < 1.0 - threshold:
+            status = "SLOWER"
+            regressions.append((r.key, f"throughput {speed:.2f}x baseline"))
+        if memory > 1.0 + threshold:
+            status = "MEMORY" if status == "ok" else status + "+MEMORY"
+            regressions.append((r.key, f"peak memory {memory:.2f}x baseline"))
+        print(f"  {status:<8} {r.key:<70} speed {speed:5.2f}x  memory {memory:5.2f}x")
+    return regressions
+
+
+def _csv(cast):
+    return lambda text: [cast(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and memory benchmarks with baseline regression checks.")
+    parser.add_argument("--grid_sizes", type=_csv(int), default=[10, 100, 500])
+    parser.add_argument("--densities", type=_csv(float), default=[0.0, 0.2])
+    parser.add_argument("--batch_sizes", type=_csv(int), default=[256, 8192])
+    parser.add_argument("--workers", type=_csv(int), default=[1, 2, 4])
+    parser.add_argument("--backends", type=_csv(str), default=["dense", "hash"])
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case; the fastest is kept")
+    parser.add_argument("--filter", type=str, default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="small parameter grid for a fast smoke run")
+    parser.add_argument("--output", type=str, default="data/benchmarks/latest.json")
+    parser.add_argument("--baseline", type=str, default="data/benchmarks/baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown / memory growth")
+    parser.add_argument("--save_baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.grid_sizes, args.densities, args.batch_sizes, args.workers = [10], [0.2], [1024], [2]
+        args.backends, args.repeats = ["dense"], 1
+
+    try:
+        results = run_suite(build_suite(args), args.repeats, args.filter)
+    finally:
+        for tmp in _TMP_DIRS:
+            shutil.rmtree(tmp, ignore_errors=True)
+    write_results(results, Path(args.output))
+    print(f"Results written to {args.output}")
+
+    baseline = Path(args.baseline)
+    if args.save_baseline:
+        write_results(results, baseline)
+        print(f"Baseline saved to {baseline}")
+        return
+    if not baseline.exists():
+        print(f"No baseline at {baseline}; run with --save_baseline to create one")
+        return
+    print(f"Comparing with {baseline} (threshold {args.threshold:.0%}):")
+    regressions = compare(results, load_results(baseline), args.threshold)
+    if regressions:
+        for key, message in regressions:
+            print(f"REGRESSION {key}: {message}")
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
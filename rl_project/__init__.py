@@ -1,5 +1,8 @@
 __all__ = [
     "envs",
     "agents",
+    "datasets",
+    "hitl",
+    "serving",
 ]
 
@@ -1,4 +1,25 @@
 from .q_learning import QLearningAgent, QLearningConfig
+from .evaluation import EvaluationReport, evaluate_policy
+from .expert import DistanceFieldExpert, distance_field_expert
+from .offline import OfflineConfig, fit_offline
+from .planning import policy_iteration, prioritized_sweeping, value_iteration
+from .qtable import BlockedQTable, DenseQTable, HashQTable, QTable, make_q_table
 
-__all__ = ["QLearningAgent", "QLearningConfig"]
-
+__all__ = [
+    "BlockedQTable",
+    "DenseQTable",
+    "DistanceFieldExpert",
+    "EvaluationReport",
+    "HashQTable",
+    "OfflineConfig",
+    "QLearningAgent",
+    "QLearningConfig",
+    "QTable",
+    "distance_field_expert",
+    "evaluate_policy",
+    "fit_offline",
+    "make_q_table",
+    "policy_iteration",
+    "prioritized_sweeping",
+    "value_iteration",
+]
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from .q_learning import QLearningAgent, QLearningConfig
+
+
+# File layout: MAGIC | uint64 header length | JSON header | zero padding | raw Q-table.
+# The table starts at a page-aligned offset so it can be mapped directly.
+MAGIC = b"RLQCKPT1"
+_PREFIX = struct.Struct("<8sQ")
+_ALIGN = 4096
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(agent: QLearningAgent, path) -> Path:
+    """Atomically write the agent's Q-table, config and step counter to `path`.
+
+    The file is written to a uniquely named temp file next to its destination
+    (so concurrent savers of one path do not collide), fsynced and moved into
+    place with `os.replace`, and the directory is fsynced so the rename itself
+    survives a crash. Readers (including processes that have the previous
+    checkpoint mapped) never see a partial file. Sparse Q-table backends are
+    stored densified.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = np.ascontiguousarray(agent.q_table, dtype="<f4")
+    header = {
+        "version": CHECKPOINT_VERSION,
+        "num_states": int(agent.num_states),
+        "num_actions": int(agent.num_actions),
+        "steps_done": int(agent._steps_done),
+        "config": asdict(agent.config),
+        "dtype": table.dtype.str,
+        "shape": list(table.shape),
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    offset = -(-(_PREFIX.size + len(header_bytes)) // _ALIGN) * _ALIGN
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b"\0" * (offset - _PREFIX.size - len(header_bytes)))
+            f.write(memoryview(table).cast("B"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    if os.name == "posix":  # directories cannot be opened for fsync on Windows
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return path
+
+
+def read_checkpoint_header(path) -> Dict:
+    """Return the JSON header of a checkpoint, plus the table's byte `offset`."""
+    with Path(path).open("rb") as f:
+        magic, length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Q-table checkpoint")
+        header = json.loads(f.read(length).decode("utf-8"))
+    header["offset"] = -(-(_PREFIX.size + length) // _ALIGN) * _ALIGN
+    return header
+
+
+def load_checkpoint(path, mode: str = "r") -> QLearningAgent:
+    """Rebuild an agent from a checkpoint without reading the table into memory.
+
+    The Q-table is an `np.memmap` of the file, so loading takes constant time
+    and processes mapping the same checkpoint share its pages:
+
+      - mode "r": read-only; for serving and dataset generation.
+      - mode "c": copy-on-write; the agent can keep training (warm start) while
+        the file stays untouched. Use `save_checkpoint` to persist.
+
+    Agents whose config selects a sparse backend get their table loaded from
+    the mapping instead (a copy).
+    """
+    if mode not in ("r", "c"):
+        raise ValueError(f"Unsupported checkpoint mode: {mode!r} (use 'r' or 'c')")
+    header = read_checkpoint_header(path)
+    config = QLearningConfig(**header["config"])
+    agent = QLearningAgent(header["num_states"], header["num_actions"], config)
+    agent.q_table = np.memmap(path, dtype=np.dtype(header["dtype"]), mode=mode,
+                              offset=header["offset"], shape=tuple(header["shape"]))
+    agent._steps_done = int(header["steps_done"])
+    return agent
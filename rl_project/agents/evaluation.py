@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from rl_project.envs.model import compile_grid_model
+from .expert import distance_field_expert
+from .q_learning import QLearningAgent
+
+
+@dataclass
+class EvaluationReport:
+    num_episodes: int
+    success_rate: float
+    mean_steps: float  # over successful episodes
+    mean_optimal_steps: float  # shortest paths from the same (successful) starts
+    path_ratio: float  # mean of steps / optimal steps over successful episodes
+    collisions: int
+    collisions_per_episode: float
+    loops: int  # episodes stopped because the policy revisited a cycle
+    truncated: int  # episodes stopped by `max_steps`
+    mean_return: float  # undiscounted environment return
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (f"success {self.success_rate:.1%} of {self.num_episodes}, steps {self.mean_steps:.1f} "
+                f"(x{self.path_ratio:.2f} optimal), collisions/ep {self.collisions_per_episode:.2f}, "
+                f"loops {self.loops}, truncated {self.truncated}, return {self.mean_return:.2f}")
+
+
+def evaluate_policy(
+    env,
+    policy: Union[QLearningAgent, np.ndarray],
+    starts: Optional[np.ndarray] = None,
+    num_starts: Optional[int] = None,
+    max_steps: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> EvaluationReport:
+    """Roll out the greedy policy from many start states at once.
+
+    All episodes advance together through the compiled model's tables (one
+    batched greedy lookup and one table step per time step), so evaluating
+    during training costs a few array operations per step. The greedy policy
+    is deterministic, so an episode that revisits a state never reaches the
+    goal; such cycles are found with Brent's algorithm (O(1) extra memory per
+    episode) and stopped early. Path lengths are compared with exact shortest
+    paths from the distance-field expert.
+
+    Args:
+      env: `GridWorldEnv` or `VectorGridWorldEnv` supplying the grid and rewards.
+      policy: Agent (any Q-table backend) or a `[S, A]` Q-table snapshot.
+      starts: Start states; default every free cell that can reach the goal.
+      num_starts: Evaluate a random sample of this many of those starts.
+      max_steps: Episode cap; default the number of states, which no
+        successful deterministic episode can exceed.
+      seed: Seed for sampling starts.
+    """
+    grid = env.grid
+    model = compile_grid_model(grid, env.step_penalty, env.obstacle_penalty, env.goal_reward)
+    distance = distance_field_expert(grid).distance
+    if isinstance(policy, QLearningAgent):
+        greedy_actions = policy.greedy_actions
+    else:
+        q = np.asarray(policy)
+
+        def greedy_actions(states: np.ndarray) -> np.ndarray:
+            return np.argmax(q[states], axis=1)
+
+    if starts is None:
+        starts = np.flatnonzero(distance > 0)  # reachable and not the goal
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1)
+    if num_starts is not None and num_starts < starts.size:
+        starts = np.random.default_rng(seed).choice(starts, size=num_starts, replace=False)
+    if max_steps is None:
+        max_steps = model.num_states
+    # if most states get visited anyway: one batched argmax over the table, then plain lookups
+    table = greedy_actions(np.arange(model.num_states)) if starts.size * 8 >= model.num_states else None
+
+    n = starts.size
+    steps = np.zeros(n, dtype=np.int64)
+    collisions = np.zeros(n, dtype=np.int64)
+    returns = np.zeros(n, dtype=np.float64)
+    success = np.zeros(n, dtype=bool)
+    looped = np.zeros(n, dtype=bool)
+    # Brent's cycle detection: the tortoise jumps to the hare whenever lam reaches power
+    tortoise = starts.copy()
+    power = np.ones(n, dtype=np.int64)
+    lam = np.zeros(n, dtype=np.int64)
+
+    active = np.flatnonzero(~model.terminal[starts])
+    state = starts.copy()
+    for _ in range(max_steps):
+        if not active.size:
+            break
+        s = state[active]
+        a = table[s] if table is not None else greedy_actions(s)
+        s_next = model.next_state[s, a]
+        state[active] = s_next
+        steps[active] += 1
+        collisions[active] += model.collision[s, a]
+        returns[active] += model.reward[s, a]
+
+        done = model.terminal[s_next]
+        success[active[done]] = True
+        lam[active] += 1
+        loop = ~done & (s_next == tortoise[active])
+        looped[active[loop]] = True
+        jump = active[~done & ~loop & (power[active] == lam[active])]
+        tortoise[jump] = state[jump]
+        power[jump] *= 2
+        lam[jump] = 0
+        active = active[~done & ~loop]
+
+    ok = success
+    optimal = distance[starts[ok]]
+    return EvaluationReport(
+        num_episodes=int(n),
+        success_rate=float(ok.mean()) if n else 0.0,
+        mean_steps=float(steps[ok].mean()) if ok.any() else 0.0,
+        mean_optimal_steps=float(optimal.mean()) if ok.any() else 0.0,
+        path_ratio=float((steps[ok] / np.maximum(optimal, 1)).mean()) if ok.any() else 0.0,
+        collisions=int(collisions.sum()),
+        collisions_per_episode=float(collisions.mean()) if n else 0.0,
+        loops=int(looped.sum()),
+        truncated=int(active.size),
+        mean_return=float(returns.mean()) if n else 0.0,
+    )
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+
+from rl_project.envs.gridworld import GridSpec
+from rl_project.envs.layouts import bfs_distances
+from rl_project.envs.model import compile_grid_model, grid_fingerprint
+
+
+_CACHE_SIZE = 8
+_EXPERT_CACHE: "OrderedDict[str, DistanceFieldExpert]" = OrderedDict()
+
+
+@dataclass(frozen=True)
+class DistanceFieldExpert:
+    """Optimal GridWorld policy read off an exact distance-to-goal field.
+
+    `distance[s]` is the shortest number of steps from `s` to the goal (-1 if
+    the goal is unreachable) and `actions[s]` a move to a neighbour one step
+    closer. Ties go to the lowest action index (up, down, left, right); states
+    that cannot reach the goal get action 0.
+
+    Build with `distance_field_expert(grid)`, which caches per layout.
+    """
+    distance: np.ndarray  # int32[S]
+    actions: np.ndarray  # int64[S]
+
+    def act(self, state: int) -> int:
+        return int(self.actions[state])
+
+    def act_batch(self, states) -> np.ndarray:
+        return self.actions[np.asarray(states, dtype=np.int64)]
+
+    def __call__(self, states) -> Union[int, np.ndarray]:
+        """Action for one state (int) or for an array of states (array)."""
+        if np.ndim(states) == 0:
+            return self.act(int(states))
+        return self.act_batch(states)
+
+
+def distance_field_expert(grid: GridSpec) -> DistanceFieldExpert:
+    """Build (or fetch from cache) the distance-field expert for `grid`.
+
+    One breadth-first search from the goal over the occupancy grid gives the
+    distance field (moves are reversible, so distances from the goal are
+    distances to it); the best action per state is then one argmin over the
+    compiled model's successor table. Both are linear in the grid size and
+    cached by `grid_fingerprint(grid)`.
+    """
+    key = grid_fingerprint(grid)
+    expert = _EXPERT_CACHE.get(key)
+    if expert is not None:
+        _EXPERT_CACHE.move_to_end(key)
+        return expert
+
+    distance = bfs_distances(~grid.occupancy, grid.goal).reshape(-1)
+    # unreachable successors sort last; collisions stay put, so they never look closer
+    cost = np.where(distance < 0, np.iinfo(np.int32).max, distance)
+    actions = np.argmin(cost[compile_grid_model(grid).next_state], axis=1)
+    for arr in (distance, actions):
+        arr.flags.writeable = False
+    expert = DistanceFieldExpert(distance, actions)
+    _EXPERT_CACHE[key] = expert
+    if len(_EXPERT_CACHE) > _CACHE_SIZE:
+        _EXPERT_CACHE.popitem(last=False)
+    return expert
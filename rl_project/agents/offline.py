@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .q_learning import QLearningAgent
+
+
+@dataclass
+class OfflineConfig:
+    epochs: int = 50  # passes over the dataset
+    batch_size: int = 4096  # transitions per streamed minibatch
+    replay_ratio: int = 1  # extra replay-sampled minibatches per streamed one
+    replay_capacity: int = 1_000_000  # transitions kept for replay sampling
+    tol: float = 1e-4  # stop once an epoch changes no Q-value by more than this
+    seed: int = 0
+
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of transitions with uniform sampling."""
+    def __init__(self, capacity: int) -> None:
+        self.capacity = int(capacity)
+        self.states = np.empty(self.capacity, dtype=np.int64)
+        self.actions = np.empty(self.capacity, dtype=np.int64)
+        self.rewards = np.empty(self.capacity, dtype=np.float64)
+        self.next_states = np.empty(self.capacity, dtype=np.int64)
+        self.dones = np.empty(self.capacity, dtype=bool)
+        self.size = 0
+        self._pos = 0
+
+    def add_batch(self, states, actions, rewards, next_states, dones) -> None:
+        n = len(states)
+        if n >= self.capacity:  # keep only the most recent transitions
+            states, actions, rewards, next_states, dones = (
+                x[-self.capacity:] for x in (states, actions, rewards, next_states, dones))
+            n = self.capacity
+        idx = (self._pos + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self._pos = (self._pos + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        idx = rng.integers(0, self.size, size=batch_size)
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx]
+
+
+@dataclass
+class OfflineReport:
+    epochs: int = 0
+    updates: int = 0
+    converged: bool = False
+    max_q_change: List[float] = field(default_factory=list)  # per epoch
+    coverage: Dict[str, float] = field(default_factory=dict)
+
+
+def dataset_coverage(visits: np.ndarray) -> Dict[str, float]:
+    """Summarize a `[num_states, num_actions]` visit-count matrix."""
+    seen_pairs = visits > 0
+    return {
+        "transitions": float(visits.sum()),
+        "state_action_coverage": float(seen_pairs.mean()),
+        "state_coverage": float(seen_pairs.any(axis=1).mean()),
+        "pairs_seen": float(seen_pairs.sum()),
+        "pairs_total": float(visits.size),
+    }
+
+
+def fit_offline(
+    agent: QLearningAgent,
+    datasets: Iterable,
+    config: Optional[OfflineConfig] = None,
+    on_epoch: Optional[Callable[[int, QLearningAgent], bool]] = None,
+) -> OfflineReport:
+    """Batch Q-learning from recorded transitions, without stepping an env.
+
+    Each epoch streams shuffled minibatches from every dataset (anything with
+    `iter_minibatches`, e.g. `TrajectoryReader`) through
+    `agent.update_batch`; each streamed batch also goes into a replay buffer,
+    from which `replay_ratio` further uniformly sampled batches are replayed.
+    Training stops after `config.epochs`, when an epoch moves no Q-value by
+    more than `config.tol`, or when `on_epoch(epoch, agent)` returns True
+    (e.g. once a target policy quality is reached).
+    """
+    config = config or OfflineConfig()
+    datasets = list(datasets)
+    rng = np.random.default_rng(config.seed)
+    replay = ReplayBuffer(config.replay_capacity)
+    visits = np.zeros((agent.num_states, agent.num_actions), dtype=np.int64)
+    report = OfflineReport()
+
+    for epoch in range(config.epochs):
+        before = agent.q_table.copy()
+        for ds in datasets:
+            for batch in ds.iter_minibatches(config.batch_size, shuffle=True, seed=int(rng.integers(2**31))):
+                s = batch["states"].astype(np.int64)
+                a = batch["actions"].astype(np.int64)
+                r = batch["rewards"].astype(np.float64)
+                s2 = batch["next_states"].astype(np.int64)
+                d = batch["dones"].astype(bool)
+                if epoch == 0:
+                    np.add.at(visits, (s, a), 1)
+                agent.update_batch(s, a, r, s2, d)
+                replay.add_batch(s, a, r, s2, d)
+                report.updates += s.size
+                for _ in range(config.replay_ratio):
+                    agent.update_batch(*replay.sample(config.batch_size, rng))
+                    report.updates += config.batch_size
+        report.epochs = epoch + 1
+        change = float(np.abs(agent.q_table - before).max())
+        report.max_q_change.append(change)
+        if epoch == 0:
+            report.coverage = dataset_coverage(visits)
+        if on_epoch is not None and on_epoch(epoch, agent):
+            break
+        if change <= config.tol:
+            report.converged = True
+            break
+    return report
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from rl_project.envs.gridworld import GridSpec
+from rl_project.envs.model import GridModel, compile_grid_model
+
+
+ModelLike = Union[GridSpec, GridModel]
+
+
+class _Backup:
+    """Vectorized Bellman backups and predecessor lookups over a `GridModel`."""
+    def __init__(self, model: GridModel, gamma: float) -> None:
+        if not 0.0 <= gamma < 1.0:
+            raise ValueError(f"discount gamma must be in [0, 1), got {gamma}")
+        self.num_states = model.num_states
+        self.num_actions = model.num_actions
+        self.next_state = model.next_state
+        self.reward = model.reward
+        self.terminal = model.terminal
+        # No bootstrapping past a terminal successor, as in QLearningAgent.update
+        self.discount = np.where(model.terminal[model.next_state], 0.0, gamma)
+
+        # Predecessors in CSR form: pred[ptr[s]:ptr[s + 1]] are the states with an action leading to s
+        flat = self.next_state.ravel()
+        self.pred = np.argsort(flat, kind="stable") // self.num_actions
+        self.pred_ptr = np.zeros(self.num_states + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flat, minlength=self.num_states), out=self.pred_ptr[1:])
+
+        # Every state value is bounded below by this, so sweeps started from it only increase
+        r_min = min(float(self.reward.min()), 0.0)
+        self.lower_bound = r_min / (1.0 - gamma)
+
+    def q_values(self, values: np.ndarray, states: np.ndarray) -> np.ndarray:
+        return self.reward[states] + self.discount[states] * values[self.next_state[states]]
+
+    def predecessors(self, states: np.ndarray) -> np.ndarray:
+        starts = self.pred_ptr[states]
+        counts = self.pred_ptr[states + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        return np.unique(self.pred[offsets])
+
+    def reverse_layers(self) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray]:
+        """Breadth-first layers of states by number of steps to a terminal state.
+
+        Returns `(layers, unreachable, distance)`; `layers[k]` holds the states
+        `k + 1` steps away and `unreachable` those that never reach a terminal
+        state (`distance == -1`). The unreachable states form a closed set.
+        """
+        distance = np.full(self.num_states, -1, dtype=np.int64)
+        frontier = np.flatnonzero(self.terminal)
+        distance[frontier] = 0
+        layers: List[np.ndarray] = []
+        while frontier.size:
+            preds = self.predecessors(frontier)
+            frontier = preds[distance[preds] < 0]
+            distance[frontier] = len(layers) + 1
+            if frontier.size:
+                layers.append(frontier)
+        return layers, np.flatnonzero(distance < 0), distance
+
+    def initial_values(self) -> np.ndarray:
+        values = np.full(self.num_states, self.lower_bound, dtype=np.float64)
+        values[self.terminal] = 0.0
+        return values
+
+    def to_q_table(self, values: np.ndarray) -> np.ndarray:
+        q = self.reward + self.discount * values[self.next_state]
+        q[self.terminal] = 0.0
+        return q.astype(np.float32)
+
+
+def _as_model(grid: ModelLike) -> GridModel:
+    return grid if isinstance(grid, GridModel) else compile_grid_model(grid)
+
+
+def _jacobi(backup: _Backup, values: np.ndarray, states: np.ndarray, tol: float, max_iterations: int) -> None:
+    for _ in range(max_iterations):
+        v = backup.q_values(values, states).max(axis=1)
+        delta = float(np.abs(v - values[states]).max())
+        values[states] = v
+        if delta < tol:
+            break
+
+
+def value_iteration(
+    grid: ModelLike,
+    gamma: float = 0.99,
+    tol: float = 1e-6,
+    max_iterations: int = 10_000,
+) -> np.ndarray:
+    """Solve for optimal Q-values by value iteration.
+
+    Each sweep visits states in order of their distance to the goal, backing up
+    a whole distance layer in one vectorized operation (Gauss-Seidel across
+    layers), so values propagate from the goal to the far corner of the grid in
+    a single sweep. Sweeps repeat until the largest value change is below `tol`.
+    States that can never reach the goal are solved separately, as they form a
+    closed sub-problem.
+
+    Args:
+      grid: Layout to solve, or an already compiled `GridModel` (e.g. `env.model`
+        when the env uses non-default rewards).
+      gamma: Discount factor, in [0, 1).
+      tol: Convergence tolerance on the max-norm value change per sweep.
+      max_iterations: Upper bound on the number of sweeps.
+
+    Returns:
+      `float32[num_states, num_actions]` Q-table, laid out like `QLearningAgent.q_table`.
+    """
+    backup = _Backup(_as_model(grid), gamma)
+    layers, unreachable, _ = backup.reverse_layers()
+    values = backup.initial_values()
+
+    for _ in range(max_iterations):
+        delta = 0.0
+        for layer in layers:
+            v = backup.q_values(values, layer).max(axis=1)
+            delta = max(delta, float(np.abs(v - values[layer]).max()))
+            values[layer] = v
+        if delta < tol:
+            break
+    if unreachable.size:
+        _jacobi(backup, values, unreachable, tol, max_iterations)
+    return backup.to_q_table(values)
+
+
+def policy_iteration(
+    grid: ModelLike,
+    gamma: float = 0.99,
+    tol: float = 1e-6,
+    max_iterations: int = 1_000,
+) -> np.ndarray:
+    """Solve for optimal Q-values by policy iteration.
+
+    Starts from a shortest-path policy towards the goal. Policies are evaluated
+    exactly (up to `tol`) by pointer doubling over the deterministic successor
+    map, which takes O(log horizon) vectorized passes, then improved greedily.
+    Stops once no state's greedy action beats its current one by more than `tol`.
+
+    Args:
+      grid: Layout to solve, or an already compiled `GridModel`.
+      gamma: Discount factor, in [0, 1).
+      tol: Tolerance for policy evaluation and for accepting an improvement.
+      max_iterations: Upper bound on improvement steps.
+
+    Returns:
+      `float32[num_states, num_actions]` Q-table, laid out like `QLearningAgent.q_table`.
+    """
+    backup = _Backup(_as_model(grid), gamma)
+    _, _, distance = backup.reverse_layers()
+    states = np.arange(backup.num_states)
+
+    # Initial policy: any action that moves one step closer to the goal
+    closer = distance[backup.next_state] == (distance - 1)[:, None]
+    policy = np.where(distance > 0, np.argmax(closer, axis=1), 0)
+
+    max_reward = max(float(np.abs(backup.reward).max()), 1e-12)
+    value_bound = max_reward / (1.0 - gamma)
+
+    values = backup.initial_values()
+    for _ in range(max_iterations):
+        # V = r_pi + discount_pi * V[next_pi], unrolled 2^k steps at a time
+        succ = backup.next_state[states, policy]
+        acc = backup.reward[states, policy]
+        mult = backup.discount[states, policy]
+        acc[backup.terminal] = 0.0
+        mult[backup.terminal] = 0.0
+        while float(mult.max()) * value_bound > tol:
+            acc = acc + mult * acc[succ]
+            mult = mult * mult[succ]
+            succ = succ[succ]
+        values = acc
+
+        q = backup.q_values(values, states)
+        best = np.argmax(q, axis=1)
+        improved = q[states, best] > q[states, policy] + tol
+        improved &= ~backup.terminal
+        if not np.any(improved):
+            break
+        policy = np.where(improved, best, policy)
+    return backup.to_q_table(values)
+
+
+def prioritized_sweeping(
+    grid: ModelLike,
+    gamma: float = 0.99,
+    tol: float = 1e-6,
+    batch_size: int = 4096,
+    max_backups: int = 1_000_000_000,
+) -> np.ndarray:
+    """Solve for optimal Q-values by (batched) prioritized sweeping.
+
+    Keeps a set of states whose Bellman residual may exceed `tol`; each round
+    backs up the `batch_size` states with the largest residual together, then
+    queues their predecessors. Starting from a lower bound on all values, the
+    updates sweep outward from the goal and most states are backed up only a
+    handful of times.
+
+    Args:
+      grid: Layout to solve, or an already compiled `GridModel`.
+      gamma: Discount factor, in [0, 1).
+      tol: Residual below which a state is considered converged.
+      batch_size: Number of highest-priority states backed up per round.
+      max_backups: Safety cap on the total number of state backups.
+
+    Returns:
+      `float32[num_states, num_actions]` Q-table, laid out like `QLearningAgent.q_table`.
+    """
+    backup = _Backup(_as_model(grid), gamma)
+    layers, unreachable, _ = backup.reverse_layers()
+    values = backup.initial_values()
+
+    queue = np.union1d(layers[0] if layers else np.empty(0, dtype=np.int64), unreachable)
+    backups = 0
+    while queue.size and backups < max_backups:
+        v = backup.q_values(values, queue).max(axis=1)
+        residual = np.abs(v - values[queue])
+        pending = residual > tol
+        queue, v, residual = queue[pending], v[pending], residual[pending]
+        if not queue.size:
+            break
+
+        if queue.size > batch_size:
+            top = np.argpartition(-residual, batch_size)[:batch_size]
+            selected, v = queue[top], v[top]
+            queue = np.delete(queue, top)
+        else:
+            selected, queue = queue, np.empty(0, dtype=np.int64)
+
+        values[selected] = v
+        backups += selected.size
+        preds = backup.predecessors(selected)
+        queue = np.union1d(queue, preds[~backup.terminal[preds]])
+    return backup.to_q_table(values)
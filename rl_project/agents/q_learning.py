@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
 import numpy as np
 
+from .qtable import QTable, make_q_table
+
 
 @dataclass
 class QLearningConfig:
@@ -13,6 +15,11 @@ class QLearningConfig:
     epsilon_start: float = 0.2
     epsilon_final: float = 0.05
     epsilon_decay_steps: int = 10_000
+    # How `update_batch` combines repeated (state, action) pairs within a batch:
+    # "sequential" matches applying them one by one, "average" uses the mean target
+    batch_duplicates: str = "sequential"
+    # Q-value storage: "dense" array, lazily allocated "blocked" rows or a sparse "hash" table
+    q_backend: str = "dense"
 
 
 class QLearningAgent:
@@ -21,34 +28,123 @@ class QLearningAgent:
     Args:
       num_states: Size of discrete observation space.
       num_actions: Size of discrete action space.
-      config: Hyperparameters (lr, gamma, epsilon schedule).
+      config: Hyperparameters (lr, gamma, epsilon schedule, Q-table backend).
+
+    Q-values live in `self.q_store` (see `rl_project.agents.qtable`). With the
+    default dense backend `q_table` is that array itself; with sparse backends
+    it is a read-only dense copy (so writing into it fails loudly instead of
+    being lost), and assigning to it loads a dense table.
     """
     def __init__(self, num_states: int, num_actions: int, config: Optional[QLearningConfig] = None) -> None:
         self.num_states = num_states
         self.num_actions = num_actions
         self.config = config or QLearningConfig()
 
-        self.q_table = np.zeros((num_states, num_actions), dtype=np.float32)
+        self.q_store: QTable = make_q_table(self.config.q_backend, num_states, num_actions)
         self._steps_done = 0
 
+    @property
+    def q_table(self) -> np.ndarray:
+        if self.q_store.backend == "dense":
+            return self.q_store.values
+        table = self.q_store.to_dense()
+        table.flags.writeable = False
+        return table
+
+    @q_table.setter
+    def q_table(self, table: np.ndarray) -> None:
+        if self.q_store.backend == "dense":
+            self.q_store.values = table  # keep views (shared memory, memmap) as they are
+        else:
+            self.q_store.load_dense(table)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Q-table memory report, see `QTable.memory_usage`."""
+        return self.q_store.memory_usage()
+
     def select_action(self, state: int) -> int:
         epsilon = self._current_epsilon()
         if np.random.rand() < epsilon:
             return int(np.random.randint(self.num_actions))
-        return int(np.argmax(self.q_table[state]))
+        return int(np.argmax(self.q_store.row(state)))
 
     def update(self, state: int, action: int, reward: float, next_state: int, done: bool) -> None:
-        best_next = 0.0 if done else float(np.max(self.q_table[next_state]))
+        """One TD update; `done` means terminated (no bootstrap), so pass False on truncation."""
+        best_next = 0.0 if done else float(np.max(self.q_store.row(next_state)))
         target = reward + self.config.discount_gamma * best_next
-        td_error = target - float(self.q_table[state, action])
-        self.q_table[state, action] += self.config.learning_rate * td_error
+        td_error = target - self.q_store.value(state, action)
+        self.q_store.add(state, action, self.config.learning_rate * td_error)
         self._steps_done += 1
 
+    def select_actions(self, states: np.ndarray) -> np.ndarray:
+        """Epsilon-greedy actions for a batch of states, at the current epsilon."""
+        states = np.asarray(states)
+        epsilon = self._current_epsilon()
+        greedy = np.argmax(self.q_store.rows(states), axis=1)
+        explore = np.random.rand(states.shape[0]) < epsilon
+        random_actions = np.random.randint(self.num_actions, size=states.shape[0])
+        return np.where(explore, random_actions, greedy)
+
+    def update_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Apply TD updates for a batch of transitions at once.
+
+        Bootstrap targets are computed from the Q-table as it was before the
+        batch. Repeated (state, action) pairs are combined according to
+        `config.batch_duplicates`: "sequential" gives the result of applying
+        their updates one after another in batch order, "average" moves the
+        entry once towards the mean of their targets. Each transition counts as
+        one step of the epsilon schedule. As in `update`, `dones` should flag
+        terminations only: truncated transitions still bootstrap.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=np.float64)
+        dones = np.asarray(dones, dtype=bool)
+        lr = self.config.learning_rate
+
+        best_next = np.where(dones, 0.0, np.max(self.q_store.rows(next_states), axis=1))
+        targets = rewards + self.config.discount_gamma * best_next
+
+        keys = states * self.num_actions + actions
+        store = self.q_store
+        if self.config.batch_duplicates == "average":
+            unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            mean_targets = np.bincount(inverse, weights=targets) / counts
+            key_states, key_actions = np.divmod(unique_keys, self.num_actions)
+            current = store.get(key_states, key_actions).astype(np.float64)
+            store.set(key_states, key_actions, current + lr * (mean_targets - current))
+        elif self.config.batch_duplicates == "sequential":
+            # k updates towards t_1..t_k give (1-lr)^k q + sum_i lr (1-lr)^(k-i) t_i
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            unique_keys, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+            group = np.repeat(np.arange(unique_keys.size), counts)
+            remaining = np.repeat(starts + counts - 1, counts) - np.arange(keys.size)
+            weights = lr * (1.0 - lr) ** remaining
+            contrib = np.bincount(group, weights=weights * targets[order], minlength=unique_keys.size)
+            key_states, key_actions = np.divmod(unique_keys, self.num_actions)
+            current = store.get(key_states, key_actions).astype(np.float64)
+            store.set(key_states, key_actions, (1.0 - lr) ** counts * current + contrib)
+        else:
+            raise ValueError(f"Unknown batch_duplicates mode: {self.config.batch_duplicates}")
+        self._steps_done += keys.size
+
     def _current_epsilon(self) -> float:
         frac = min(1.0, self._steps_done / max(1, self.config.epsilon_decay_steps))
         return float(self.config.epsilon_start + frac * (self.config.epsilon_final - self.config.epsilon_start))
 
     def greedy_action(self, state: int) -> int:
-        return int(np.argmax(self.q_table[state]))
+        return int(np.argmax(self.q_store.row(state)))
+
+    def greedy_actions(self, states: np.ndarray) -> np.ndarray:
+        """Greedy actions for a batch of states (works with every Q-table backend)."""
+        return np.argmax(self.q_store.rows(np.asarray(states)), axis=1)
 
 
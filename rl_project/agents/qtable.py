@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class QTable(ABC):
+    """Storage interface for a `[num_states, num_actions]` table of float32 Q-values.
+
+    Entries that were never written read as 0.0, so sparse backends only need
+    to store the states an agent actually updates. Batch methods take integer
+    arrays; `row`/`value`/`add` are the scalar fast paths used per env step.
+    """
+    backend = "base"
+
+    def __init__(self, num_states: int, num_actions: int) -> None:
+        self.num_states = int(num_states)
+        self.num_actions = int(num_actions)
+
+    @abstractmethod
+    def row(self, state: int) -> np.ndarray:
+        """Q-values of one state (may be a view; do not write to it)."""
+
+    def value(self, state: int, action: int) -> float:
+        return float(self.row(state)[action])
+
+    @abstractmethod
+    def add(self, state: int, action: int, delta: float) -> None:
+        """In-place `Q[state, action] += delta` (float32 arithmetic)."""
+
+    @abstractmethod
+    def rows(self, states: np.ndarray) -> np.ndarray:
+        """`float32[n, num_actions]` Q-values of a batch of states."""
+
+    def get(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        return self.rows(states)[np.arange(len(states)), actions]
+
+    @abstractmethod
+    def set(self, states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> None:
+        """Batch assignment `Q[states, actions] = values`."""
+
+    @abstractmethod
+    def to_dense(self) -> np.ndarray:
+        """Materialize the full `float32[num_states, num_actions]` table (a copy)."""
+
+    @abstractmethod
+    def load_dense(self, table: np.ndarray) -> None:
+        """Replace the contents with a dense table; all-zero rows are not stored."""
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        """Bytes currently allocated for Q-values and index structures."""
+
+    @property
+    @abstractmethod
+    def stored_states(self) -> int:
+        """Number of states with allocated storage."""
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Allocated memory compared with a dense table of the same shape.
+
+        `backend` is the backend name; every other entry is a number.
+        """
+        dense_bytes = self.num_states * self.num_actions * 4
+        return {
+            "backend": self.backend,
+            "bytes": float(self.nbytes),
+            "dense_bytes": float(dense_bytes),
+            "fraction_of_dense": self.nbytes / dense_bytes if dense_bytes else 0.0,
+            "stored_states": float(self.stored_states),
+            "num_states": float(self.num_states),
+        }
+
+
+class DenseQTable(QTable):
+    """One preallocated `float32[num_states, num_actions]` array (the default)."""
+    backend = "dense"
+
+    def __init__(self, num_states: int, num_actions: int) -> None:
+        super().__init__(num_states, num_actions)
+        self.values = np.zeros((self.num_states, self.num_actions), dtype=np.float32)
+
+    def row(self, state: int) -> np.ndarray:
+        return self.values[state]
+
+    def value(self, state: int, action: int) -> float:
+        return self.values.item(state, action)
+
+    def add(self, state: int, action: int, delta: float) -> None:
+        self.values[state, action] += delta
+
+    def rows(self, states: np.ndarray) -> np.ndarray:
+        return self.values[states]
+
+    def get(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        return self.values[states, actions]
+
+    def set(self, states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> None:
+        self.values[states, actions] = values
+
+    def to_dense(self) -> np.ndarray:
+        return self.values.copy()
+
+    def load_dense(self, table: np.ndarray) -> None:
+        self.values[:] = table
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes)
+
+    @property
+    def stored_states(self) -> int:
+        return self.num_states
+
+
+class BlockedQTable(QTable):
+    """Dense blocks of `block_size` consecutive states, allocated on first write.
+
+    Good when visited states are spatially clustered (e.g. one region of a big
+    map): memory is proportional to the number of touched blocks.
+    """
+    backend = "blocked"
+
+    def __init__(self, num_states: int, num_actions: int, block_size: int = 1024) -> None:
+        super().__init__(num_states, num_actions)
+        self.block_size = max(1, min(int(block_size), self.num_states))
+        num_blocks = -(-self.num_states // self.block_size)
+        self._blocks: List[Optional[np.ndarray]] = [None] * num_blocks
+        self._num_allocated = 0
+        self._zero_row = np.zeros(self.num_actions, dtype=np.float32)
+        self._zero_row.flags.writeable = False
+
+    def _block(self, index: int) -> np.ndarray:
+        block = self._blocks[index]
+        if block is None:
+            block = np.zeros((self.block_size, self.num_actions), dtype=np.float32)
+            self._blocks[index] = block
+            self._num_allocated += 1
+        return block
+
+    def row(self, state: int) -> np.ndarray:
+        b, offset = divmod(state, self.block_size)
+        block = self._blocks[b]
+        return self._zero_row if block is None else block[offset]
+
+    def add(self, state: int, action: int, delta: float) -> None:
+        b, offset = divmod(state, self.block_size)
+        self._block(b)[offset, action] += delta
+
+    def _segments(self, states: np.ndarray):
+        """Yield `(block_index, positions, offsets)` grouping a batch by block."""
+        states = np.asarray(states, dtype=np.int64)
+        blocks = states // self.block_size
+        order = np.argsort(blocks, kind="stable")
+        unique_blocks, starts = np.unique(blocks[order], return_index=True)
+        ends = np.append(starts[1:], order.size)
+        for b, start, end in zip(unique_blocks.tolist(), starts, ends):
+            positions = order[start:end]
+            yield b, positions, states[positions] - b * self.block_size
+
+    def rows(self, states: np.ndarray) -> np.ndarray:
+        out = np.zeros((len(states), self.num_actions), dtype=np.float32)
+        for b, positions, offsets in self._segments(states):
+            block = self._blocks[b]
+            if block is not None:
+                out[positions] = block[offsets]
+        return out
+
+    def set(self, states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> None:
+        actions = np.asarray(actions, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=np.float32), actions.shape)
+        for b, positions, offsets in self._segments(states):
+            self._block(b)[offsets, actions[positions]] = values[positions]
+
+    def to_dense(self) -> np.ndarray:
+        out = np.zeros((self.num_states, self.num_actions), dtype=np.float32)
+        for b, block in enumerate(self._blocks):
+            if block is not None:
+                start = b * self.block_size
+                out[start:start + self.block_size] = block[:self.num_states - start]
+        return out
+
+    def load_dense(self, table: np.ndarray) -> None:
+        table = np.asarray(table, dtype=np.float32)
+        self._blocks = [None] * len(self._blocks)
+        self._num_allocated = 0
+        for b in range(len(self._blocks)):
+            chunk = table[b * self.block_size:(b + 1) * self.block_size]
+            if chunk.any():
+                self._block(b)[:len(chunk)] = chunk
+
+    @property
+    def nbytes(self) -> int:
+        return self._num_allocated * self.block_size * self.num_actions * 4 + len(self._blocks) * 8
+
+    @property
+    def stored_states(self) -> int:
+        # the last block may extend past num_states; only count the rows in range
+        last = len(self._blocks) - 1
+        unused = (last + 1) * self.block_size - self.num_states
+        return self._num_allocated * self.block_size - (unused if self._blocks[last] is not None else 0)
+
+
+_EMPTY = -1
+_FIBONACCI = 0x9E3779B97F4A7C15  # 2**64 / golden ratio, for multiplicative hashing
+_MASK64 = (1 << 64) - 1
+
+
+class HashQTable(QTable):
+    """Open-addressing hash table from state to a Q-value row (linear probing).
+
+    Memory is proportional to the number of states ever updated, whatever the
+    size of the state space, which suits scattered visits over huge or composite
+    state spaces. The table doubles when the load factor exceeds `max_load`.
+    Batch lookups and inserts probe all keys in lockstep with NumPy.
+    """
+    backend = "hash"
+
+    def __init__(self, num_states: int, num_actions: int, capacity: int = 64, max_load: float = 0.5) -> None:
+        super().__init__(num_states, num_actions)
+        self.max_load = float(max_load)
+        self._allocate(1 << max(4, int(capacity - 1).bit_length()))
+        self._zero_row = np.zeros(self.num_actions, dtype=np.float32)
+        self._zero_row.flags.writeable = False
+
+    def _allocate(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._shift = 64 - (capacity.bit_length() - 1)
+        self._keys = np.full(capacity, _EMPTY, dtype=np.int64)
+        self._values = np.zeros((capacity, self.num_actions), dtype=np.float32)
+        self._size = 0
+
+    def _hash(self, states: np.ndarray) -> np.ndarray:
+        h = np.asarray(states, dtype=np.int64).astype(np.uint64) * np.uint64(_FIBONACCI)
+        return (h >> np.uint64(self._shift)).astype(np.int64)
+
+    def _slot(self, state: int, create: bool) -> int:
+        """Scalar probe: slot holding `state`, or -1 (or a new slot with `create`)."""
+        state = int(state)
+        mask = self._capacity - 1
+        slot = ((state * _FIBONACCI) & _MASK64) >> self._shift
+        keys = self._keys
+        while True:
+            key = keys.item(slot)
+            if key == state:
+                return slot
+            if key == _EMPTY:
+                break
+            slot = (slot + 1) & mask
+        if not create:
+            return -1
+        if self._size + 1 > self.max_load * self._capacity:
+            self._grow(self._size + 1)
+            return self._slot(state, create)
+        keys[slot] = state
+        self._size += 1
+        return slot
+
+    def _find(self, states: np.ndarray) -> np.ndarray:
+        """Vectorized probe: slot of each state, -1 where absent."""
+        states = np.asarray(states, dtype=np.int64)
+        mask = self._capacity - 1
+        slots = self._hash(states)
+        found = np.full(states.size, -1, dtype=np.int64)
+        pending = np.arange(states.size)
+        while pending.size:
+            keys = self._keys[slots[pending]]
+            hit = keys == states[pending]
+            found[pending[hit]] = slots[pending[hit]]
+            pending = pending[~hit & (keys != _EMPTY)]
+            slots[pending] = (slots[pending] + 1) & mask
+        return found
+
+    def _insert(self, states: np.ndarray) -> np.ndarray:
+        """Insert distinct, absent states; returns their slots."""
+        if self._size + states.size > self.max_load * self._capacity:
+            self._grow(self._size + states.size)
+        mask = self._capacity - 1
+        slots = self._hash(states)
+        pending = np.arange(states.size)
+        while pending.size:
+            candidate = slots[pending]
+            free = self._keys[candidate] == _EMPTY
+            # Several keys may race for one empty slot: one write wins, the rest keep probing
+            self._keys[candidate[free]] = states[pending[free]]
+            won = free & (self._keys[candidate] == states[pending])
+            pending = pending[~won]
+            slots[pending] = (slots[pending] + 1) & mask
+        self._size += states.size
+        return slots
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while needed > self.max_load * capacity:
+            capacity *= 2
+        present = self._keys != _EMPTY
+        keys, values = self._keys[present], self._values[present]
+        self._allocate(capacity)
+        self._values[self._insert(keys)] = values
+
+    def _slots(self, states: np.ndarray, create: bool) -> np.ndarray:
+        slots = self._find(states)
+        missing = slots < 0
+        if create and missing.any():
+            new_states, inverse = np.unique(np.asarray(states, dtype=np.int64)[missing], return_inverse=True)
+            if self._size + new_states.size > self.max_load * self._capacity:
+                self._grow(self._size + new_states.size)  # moves every key: look the others up again
+                slots = self._find(states)
+            slots[missing] = self._insert(new_states)[inverse]
+        return slots
+
+    def row(self, state: int) -> np.ndarray:
+        slot = self._slot(state, create=False)
+        return self._zero_row if slot < 0 else self._values[slot]
+
+    def add(self, state: int, action: int, delta: float) -> None:
+        slot = self._slot(state, create=True)  # may grow (and replace) the arrays
+        self._values[slot, action] += delta
+
+    def rows(self, states: np.ndarray) -> np.ndarray:
+        slots = self._find(states)
+        out = np.zeros((slots.size, self.num_actions), dtype=np.float32)
+        hit = slots >= 0
+        out[hit] = self._values[slots[hit]]
+        return out
+
+    def get(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        slots = self._find(states)
+        return np.where(slots >= 0, self._values[np.maximum(slots, 0), actions], np.float32(0.0))
+
+    def set(self, states: np.ndarray, actions: np.ndarray, values: np.ndarray) -> None:
+        slots = self._slots(states, create=True)  # may grow (and replace) the arrays
+        self._values[slots, actions] = values
+
+    def to_dense(self) -> np.ndarray:
+        out = np.zeros((self.num_states, self.num_actions), dtype=np.float32)
+        present = self._keys != _EMPTY
+        out[self._keys[present]] = self._values[present]
+        return out
+
+    def load_dense(self, table: np.ndarray) -> None:
+        table = np.asarray(table, dtype=np.float32)
+        states = np.flatnonzero(table.any(axis=1))
+        self._allocate(self._capacity)
+        self._values[self._insert(states)] = table[states]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._keys.nbytes + self._values.nbytes)
+
+    @property
+    def stored_states(self) -> int:
+        return self._size
+
+
+Q_BACKENDS = {
+    "dense": DenseQTable,
+    "blocked": BlockedQTable,
+    "hash": HashQTable,
+}
+
+
+def make_q_table(backend: str, num_states: int, num_actions: int, **kwargs) -> QTable:
+    """Create a Q-table storage backend by name ("dense", "blocked" or "hash")."""
+    try:
+        cls = Q_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown Q-table backend: {backend}") from None
+    return cls(num_states, num_actions, **kwargs)
@@ -0,0 +1,9 @@
+from .columnar import (
+    TrajectoryReader,
+    TrajectoryWriter,
+    columnar_to_jsonl,
+    jsonl_to_columnar,
+    open_trajectories,
+)
+
+__all__ = ["TrajectoryReader", "TrajectoryWriter", "columnar_to_jsonl", "jsonl_to_columnar", "open_trajectories"]
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+FORMAT_NAME = "rl-trajectories"
+FORMAT_VERSION = 1
+
+# Column name -> on-disk dtype. Each column is one raw little-endian file.
+COLUMNS: Dict[str, np.dtype] = {
+    "states": np.dtype("<i4"),
+    "actions": np.dtype("u1"),
+    "rewards": np.dtype("<f4"),
+    "next_states": np.dtype("<i4"),
+    "dones": np.dtype("u1"),
+}
+_EPISODE_ENDS = "episode_ends"  # int64 end offset (exclusive) of each episode
+
+
+class TrajectoryWriter:
+    """Write transitions into a columnar trajectory directory, chunk by chunk.
+
+    Transitions are buffered in preallocated arrays and appended to one raw
+    file per column every `chunk_size` transitions; `meta.json` is atomically
+    replaced after each flush, so a crash loses at most the unflushed chunk and
+    readers never see a partial one.
+
+    Usage:
+      with TrajectoryWriter("data/expert") as w:
+          w.add_episode(states, actions, rewards, next_states, dones)
+    """
+    def __init__(self, path, chunk_size: int = 65_536) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = int(chunk_size)
+        self._buffers = {name: np.empty(self.chunk_size, dtype=dt) for name, dt in COLUMNS.items()}
+        self._fill = 0
+        self._episode_ends: list = []
+        self.num_transitions = 0
+        self._flushed_transitions = 0
+        self._flushed_episodes = 0
+        self._files = {name: (self.path / f"{name}.bin").open("wb") for name in COLUMNS}
+        self._ends_file = (self.path / f"{_EPISODE_ENDS}.bin").open("wb")
+        self._write_meta()
+
+    def add(self, state: int, action: int, reward: float, next_state: int, done: bool) -> None:
+        """Append one transition; an episode ends at a transition with `done`."""
+        i = self._fill
+        b = self._buffers
+        b["states"][i] = state
+        b["actions"][i] = action
+        b["rewards"][i] = reward
+        b["next_states"][i] = next_state
+        b["dones"][i] = done
+        self._fill += 1
+        self.num_transitions += 1
+        if done:
+            self._episode_ends.append(self.num_transitions)
+        if self._fill == self.chunk_size:
+            self.flush()
+
+    def add_episode(self, states, actions, rewards, next_states, dones) -> None:
+        """Append a whole episode given as equal-length arrays."""
+        n = len(states)
+        columns = {"states": states, "actions": actions, "rewards": rewards, "next_states": next_states, "dones": dones}
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_size - self._fill)
+            for name, values in columns.items():
+                self._buffers[name][self._fill:self._fill + take] = np.asarray(values[start:start + take])
+            self._fill += take
+            self.num_transitions += take
+            start += take
+            if self._fill == self.chunk_size:
+                self.flush()
+        self.end_episode()
+
+    def end_episode(self) -> None:
+        """Close the current episode (e.g. after truncation without `done`)."""
+        if self.num_transitions and (not self._episode_ends or self._episode_ends[-1] != self.num_transitions):
+            self._episode_ends.append(self.num_transitions)
+
+    def flush(self) -> None:
+        for name, f in self._files.items():
+            f.write(self._buffers[name][:self._fill].tobytes())
+            f.flush()
+        if self._episode_ends:
+            self._ends_file.write(np.asarray(self._episode_ends, dtype="<i8").tobytes())
+            self._ends_file.flush()
+            self._flushed_episodes += len(self._episode_ends)
+            self._episode_ends = []
+        self._flushed_transitions += self._fill
+        self._fill = 0
+        self._write_meta()
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._ends_file.close()
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "columns": {name: dt.str for name, dt in COLUMNS.items()},
+            "num_transitions": self._flushed_transitions,
+            "num_episodes": self._flushed_episodes,
+        }
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp, self.path / "meta.json")
+
+
+class TrajectoryReader:
+    """Memory-mapped view of a columnar trajectory directory.
+
+    Columns are exposed as read-only `np.memmap` arrays, so opening is O(1) and
+    only the pages actually touched are read from disk. A reader that owns its
+    directory (a temporary conversion, see `open_trajectories`) deletes it on
+    `close()`; readers are also context managers.
+    """
+    def __init__(self, path, owned_dir: Optional[tempfile.TemporaryDirectory] = None) -> None:
+        self.path = Path(path)
+        self._owned_dir = owned_dir
+        meta = json.loads((self.path / "meta.json").read_text())
+        if meta.get("format") != FORMAT_NAME:
+            raise ValueError(f"{self.path} is not a trajectory dataset")
+        self.meta = meta
+        self.num_transitions = int(meta["num_transitions"])
+        self.num_episodes = int(meta["num_episodes"])
+        self.columns: Dict[str, np.ndarray] = {
+            name: self._map(name, np.dtype(dt), self.num_transitions) for name, dt in meta["columns"].items()
+        }
+        self.episode_ends = self._map(_EPISODE_ENDS, np.dtype("<i8"), self.num_episodes)
+
+    def _map(self, name: str, dtype: np.dtype, count: int) -> np.ndarray:
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path / f"{name}.bin", dtype=dtype, mode="r", shape=(count,))
+
+    def __len__(self) -> int:
+        return self.num_transitions
+
+    def close(self) -> None:
+        self.columns = {}
+        self.episode_ends = np.empty(0, dtype="<i8")
+        if self._owned_dir is not None:
+            self._owned_dir.cleanup()
+            self._owned_dir = None
+
+    def __enter__(self) -> "TrajectoryReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def episode_starts(self) -> np.ndarray:
+        return np.concatenate([[0], self.episode_ends[:-1]]).astype(np.int64)
+
+    def episode(self, index: int) -> Dict[str, np.ndarray]:
+        start = int(self.episode_starts[index])
+        end = int(self.episode_ends[index])
+        return {name: col[start:end] for name, col in self.columns.items()}
+
+    def iter_minibatches(
+        self,
+        batch_size: int,
+        shuffle: bool = False,
+        seed: Optional[int] = None,
+        drop_last: bool = False,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield dicts of column arrays with `batch_size` transitions each.
+
+        Sequential batches are contiguous slices of the mapped files; with
+        `shuffle`, each batch gathers a random subset of indices (one random
+        permutation per pass), still without loading the whole dataset.
+        """
+        n = self.num_transitions
+        order = np.random.default_rng(seed).permutation(n) if shuffle else None
+        for start in range(0, n, batch_size):
+            end = min(start + batch_size, n)
+            if drop_last and end - start < batch_size:
+                break
+            if order is None:
+                yield {name: np.asarray(col[start:end]) for name, col in self.columns.items()}
+            else:
+                idx = np.sort(order[start:end])
+                yield {name: col[idx] for name, col in self.columns.items()}
+
+
+def jsonl_to_columnar(src, dst, chunk_size: int = 65_536) -> int:
+    """Convert a `generate_dataset.py` JSONL file to the columnar format.
+
+    Returns the number of transitions written.
+    """
+    with TrajectoryWriter(dst, chunk_size=chunk_size) as writer, Path(src).open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            transitions = json.loads(line)["transitions"]
+            if not transitions:
+                continue
+            writer.add_episode(
+                [t["s"] for t in transitions],
+                [t["a"] for t in transitions],
+                [t["r"] for t in transitions],
+                [t["s_next"] for t in transitions],
+                [t["done"] for t in transitions],
+            )
+        return writer.num_transitions
+
+
+def columnar_to_jsonl(src, dst) -> int:
+    """Convert a columnar trajectory directory back to the JSONL episode format.
+
+    Returns the number of episodes written.
+    """
+    reader = TrajectoryReader(src)
+    with Path(dst).open("w", encoding="utf-8") as f:
+        for i in range(reader.num_episodes):
+            ep = reader.episode(i)
+            transitions = [
+                {"s": int(s), "a": int(a), "r": float(r), "s_next": int(s2), "done": bool(d)}
+                for s, a, r, s2, d in zip(ep["states"], ep["actions"], ep["rewards"], ep["next_states"], ep["dones"])
+            ]
+            f.write(json.dumps({"transitions": transitions}, ensure_ascii=False) + "\n")
+    return reader.num_episodes
+
+
+def open_trajectories(path) -> List[TrajectoryReader]:
+    """Open any dataset produced by `generate_dataset.py` as trajectory readers.
+
+    Accepts a columnar directory, a sharded output directory (`manifest.json`,
+    one reader per shard) or a JSONL file, which is first converted into a
+    temporary columnar directory that is removed when its reader is closed.
+    """
+    path = Path(path)
+    if (path / "manifest.json").exists():
+        manifest = json.loads((path / "manifest.json").read_text())
+        readers = []
+        for shard in manifest["shards"]:
+            shard_path = path / shard["path"]
+            readers.extend(open_trajectories(shard_path))
+        return readers
+    if (path / "meta.json").exists():
+        return [TrajectoryReader(path)]
+    tmp = tempfile.TemporaryDirectory(prefix="trajectories-")
+    try:
+        jsonl_to_columnar(path, tmp.name)
+        return [TrajectoryReader(tmp.name, owned_dir=tmp)]
+    except BaseException:
+        tmp.cleanup()
+        raise
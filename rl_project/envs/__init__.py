@@ -1,4 +1,20 @@
-from .gridworld import GridWorldEnv, make_default_grid
-
-__all__ = ["GridWorldEnv", "make_default_grid"]
+from .gridworld import GridSpec, GridWorldEnv, make_default_grid
+from .layouts import LayoutReport, bfs_distances, load_layout, validate_layout
+from .model import GridModel, compile_grid_model, grid_fingerprint
+from .multi_agent import MultiAgentGridWorldEnv
+from .vector_gridworld import VectorGridWorldEnv
 
+__all__ = [
+    "GridSpec",
+    "GridWorldEnv",
+    "GridModel",
+    "LayoutReport",
+    "MultiAgentGridWorldEnv",
+    "VectorGridWorldEnv",
+    "bfs_distances",
+    "compile_grid_model",
+    "grid_fingerprint",
+    "load_layout",
+    "make_default_grid",
+    "validate_layout",
+]
@@ -1,23 +1,82 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from rl_project.spaces import Discrete
 
+from .model import GridModel, compile_grid_model
+
 
 Action = int  # 0: up, 1: down, 2: left, 3: right
 Position = Tuple[int, int]
 
 
-@dataclass
+@dataclass(eq=False)
 class GridSpec:
+    """Grid layout: size, start, goal and obstacle cells.
+
+    Obstacles can be given as a list of `(x, y)` positions (handy for small
+    hand-written maps) or as a boolean `occupancy[height, width]` array (large
+    maps, see `GridSpec.from_occupancy`). `occupancy` is always populated and is
+    the source of truth for obstacles: read walls through it (or
+    `is_obstacle`), never through `obstacles`, which is only the input list and
+    stays empty for specs built from an array.
+
+    Specs compare and hash by size, start, goal and `occupancy`, however they
+    were built, and key the compiled-model caches. Treat them as immutable:
+    `occupancy` is a private read-only copy, so it cannot change under a key.
+    """
     width: int
     height: int
     start: Position
     goal: Position
-    obstacles: List[Position]
+    obstacles: List[Position] = field(default_factory=list)
+    occupancy: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.occupancy is None:
+            occupancy = np.zeros((self.height, self.width), dtype=bool)
+            if self.obstacles:
+                xs, ys = np.asarray(self.obstacles, dtype=np.int64).reshape(-1, 2).T
+                outside = (xs < 0) | (xs >= self.width) | (ys < 0) | (ys >= self.height)
+                if outside.any():
+                    i = int(np.argmax(outside))
+                    raise ValueError(f"obstacle {self.obstacles[i]} lies outside the {self.width}x{self.height} grid")
+                occupancy[ys, xs] = True
+        else:
+            occupancy = np.array(self.occupancy, dtype=bool)  # own copy: the caller's array may change
+            if occupancy.shape != (self.height, self.width):
+                raise ValueError(f"occupancy shape {occupancy.shape} does not match grid {(self.height, self.width)}")
+        occupancy.flags.writeable = False
+        self.occupancy = occupancy
+
+    def _key(self) -> Tuple:
+        return (self.width, self.height, tuple(self.start), tuple(self.goal), np.packbits(self.occupancy).tobytes())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GridSpec):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    @classmethod
+    def from_occupancy(cls, occupancy: np.ndarray, start: Position, goal: Position) -> "GridSpec":
+        """Build a spec from a boolean `[height, width]` array (True = obstacle)."""
+        occupancy = np.asarray(occupancy, dtype=bool)
+        height, width = occupancy.shape
+        return cls(width=width, height=height, start=tuple(start), goal=tuple(goal), occupancy=occupancy)
+
+    def is_obstacle(self, pos: Position) -> bool:
+        x, y = pos
+        return bool(self.occupancy[y, x])
+
+    @property
+    def num_obstacles(self) -> int:
+        return int(np.count_nonzero(self.occupancy))
 
 
 def make_default_grid() -> GridSpec:
@@ -41,6 +100,15 @@ class GridWorldEnv:
       - step penalty (default -1)
       - obstacle collision penalty (default -5) and stay in place
       - goal reward (default +10) and terminate
+
+    Dynamics are looked up in the `GridModel` compiled once per layout
+    (`self.model`), so a step is a few table reads.
+
+    With `max_episode_steps`, an episode that has not reached the goal after
+    that many steps is truncated (`truncated=True`, Gymnasium time-limit
+    semantics); learners should still bootstrap from the last state, since the
+    episode was cut off rather than ended. `info["episode_step"]` counts the
+    steps taken in the current episode.
     """
     metadata = {"render_modes": ["ansi"], "render_fps": 10}
 
@@ -51,65 +119,62 @@ class GridWorldEnv:
         obstacle_penalty: float = -5.0,
         goal_reward: float = 10.0,
         render_mode: Optional[str] = None,
+        max_episode_steps: Optional[int] = None,
     ) -> None:
+        if max_episode_steps is not None and max_episode_steps <= 0:
+            raise ValueError(f"max_episode_steps must be positive, got {max_episode_steps}")
         self.grid = grid or make_default_grid()
         self.step_penalty = step_penalty
         self.obstacle_penalty = obstacle_penalty
         self.goal_reward = goal_reward
         self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps
 
         self.observation_space = Discrete(self.grid.width * self.grid.height)
         self.action_space = Discrete(4)
+        self.model: GridModel = compile_grid_model(self.grid, step_penalty, obstacle_penalty, goal_reward)
 
         self._position: Position = self.grid.start
+        self._state = self._pos_to_state(self._position)
         self._terminated = False
         self._truncated = False
+        self._elapsed_steps = 0
 
     def reset(self, *, seed: Optional[int] = None, options: Optional[Dict] = None):
         if seed is not None:
             np.random.seed(seed)
         self._position = self.grid.start
+        self._state = self._pos_to_state(self._position)
         self._terminated = False
         self._truncated = False
-        return self._pos_to_state(self._position), {}
+        self._elapsed_steps = 0
+        return self._state, {}
 
     # Gymnasium step signature
     def step(self, action: Action):
         if self._terminated or self._truncated:
             raise RuntimeError("Call reset() before step() after termination.")
 
-        next_position = self._move(self._position, action)
-        reward = self.step_penalty
-        info: Dict = {}
-
-        if next_position in self.grid.obstacles:
-            # collision -> stay put and penalize
-            reward += self.obstacle_penalty
-            next_position = self._position
-            info["collision"] = True
+        if not 0 <= action < self.action_space.n:
+            raise ValueError(f"Invalid action: {action}")
 
-        self._position = next_position
+        model = self.model
+        state = self._state
+        reward = model.reward.item(state, action)
+        self._elapsed_steps += 1
+        info: Dict = {"episode_step": self._elapsed_steps}
 
-        if self._position == self.grid.goal:
-            reward += self.goal_reward
-            self._terminated = True
+        if model.collision.item(state, action):
+            # collision -> stayed put and penalized
+            info["collision"] = True
 
-        observation = self._pos_to_state(self._position)
-        return observation, float(reward), self._terminated, self._truncated, info
+        self._state = model.next_state.item(state, action)
+        self._position = self._state_to_pos(self._state)
+        self._terminated = model.terminal.item(self._state)
+        if self.max_episode_steps is not None:
+            self._truncated = self._elapsed_steps >= self.max_episode_steps
 
-    def _move(self, pos: Position, action: Action) -> Position:
-        x, y = pos
-        if action == 0:  # up
-            y = max(0, y - 1)
-        elif action == 1:  # down
-            y = min(self.grid.height - 1, y + 1)
-        elif action == 2:  # left
-            x = max(0, x - 1)
-        elif action == 3:  # right
-            x = min(self.grid.width - 1, x + 1)
-        else:
-            raise ValueError(f"Invalid action: {action}")
-        return (x, y)
+        return self._state, reward, self._terminated, self._truncated, info
 
     def _pos_to_state(self, pos: Position) -> int:
         x, y = pos
@@ -121,9 +186,7 @@ class GridWorldEnv:
 
     # Simple ANSI rendering for console
     def render(self):
-        grid = np.full((self.grid.height, self.grid.width), fill_value=".", dtype=object)
-        for (ox, oy) in self.grid.obstacles:
-            grid[oy, ox] = "#"
+        grid = np.where(self.grid.occupancy, "#", ".").astype(object)
         sx, sy = self.grid.start
         gx, gy = self.grid.goal
         grid[sy, sx] = "S"
@@ -135,9 +198,7 @@ class GridWorldEnv:
 
     # Utility for visualization
     def as_array(self, agent_pos: Optional[Position] = None) -> np.ndarray:
-        arr = np.zeros((self.grid.height, self.grid.width), dtype=int)
-        for (ox, oy) in self.grid.obstacles:
-            arr[oy, ox] = -1
+        arr = np.where(self.grid.occupancy, -1, 0)
         gx, gy = self.grid.goal
         arr[gy, gx] = 2
         if agent_pos is None:
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .gridworld import GridSpec, Position
+
+
+# Text layouts: one row per line, one cell per character
+OBSTACLE_CHARS = b"#@X"
+START_CHAR = ord("S")
+GOAL_CHAR = ord("G")
+
+
+def bfs_distances(free: np.ndarray, source: Position) -> np.ndarray:
+    """Shortest 4-neighbour step counts from `source` over the `free` cells.
+
+    Frontier-at-a-time breadth-first search over flat cell indices: every cell
+    enters the frontier at most once, so the work is linear in the grid size.
+    Moves in GridWorld are reversible, so this is also the distance *to*
+    `source`.
+
+    Args:
+      free: Boolean `[height, width]` array, True where the agent may stand.
+      source: `(x, y)` cell to measure distances from.
+
+    Returns:
+      `int32[height, width]` distances, -1 for unreachable (or blocked) cells.
+    """
+    height, width = free.shape
+    free_flat = np.ascontiguousarray(free).reshape(-1)
+    dist = np.full(free_flat.size, -1, dtype=np.int32)
+    sx, sy = source
+    start = sy * width + sx
+    if not free_flat[start]:
+        return dist.reshape(height, width)
+    dist[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    level = 0
+    while frontier.size:
+        level += 1
+        x = frontier % width
+        candidates = np.concatenate([
+            frontier[frontier >= width] - width,  # up
+            frontier[frontier < free_flat.size - width] + width,  # down
+            frontier[x > 0] - 1,  # left
+            frontier[x < width - 1] + 1,  # right
+        ])
+        candidates = candidates[free_flat[candidates] & (dist[candidates] < 0)]
+        frontier = np.unique(candidates)
+        dist[frontier] = level
+    return dist.reshape(height, width)
+
+
+@dataclass
+class LayoutReport:
+    width: int
+    height: int
+    num_obstacles: int
+    reachable_cells: int  # free cells reachable from the start
+    goal_distance: int  # shortest path length start -> goal, -1 if unreachable
+
+
+def validate_layout(spec: GridSpec) -> LayoutReport:
+    """Check that `spec` is usable and that the goal is reachable from the start.
+
+    Runs one linear-time BFS over the occupancy grid, so it is suitable for
+    multi-million-cell maps.
+
+    Raises:
+      ValueError: if start or goal are out of bounds or on an obstacle, or if
+        the goal cannot be reached from the start.
+    """
+    for name, (x, y) in (("start", spec.start), ("goal", spec.goal)):
+        if not (0 <= x < spec.width and 0 <= y < spec.height):
+            raise ValueError(f"{name} {(x, y)} is outside the {spec.width}x{spec.height} grid")
+        if spec.occupancy[y, x]:
+            raise ValueError(f"{name} {(x, y)} is on an obstacle")
+    dist = bfs_distances(~spec.occupancy, spec.start)
+    gx, gy = spec.goal
+    report = LayoutReport(
+        width=spec.width,
+        height=spec.height,
+        num_obstacles=spec.num_obstacles,
+        reachable_cells=int(np.count_nonzero(dist >= 0)),
+        goal_distance=int(dist[gy, gx]),
+    )
+    if report.goal_distance < 0:
+        raise ValueError(f"goal {spec.goal} is not reachable from start {spec.start}")
+    return report
+
+
+def layout_from_text(text: str, start: Optional[Position] = None, goal: Optional[Position] = None) -> GridSpec:
+    """Parse a character map: `#`/`@`/`X` obstacle, `S` start, `G` goal, anything else free.
+
+    `start`/`goal` arguments override the `S`/`G` markers; without either, the
+    top-left and bottom-right corners are used.
+    """
+    lines = [line.rstrip("\r") for line in text.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("empty layout")
+    width = max(len(line) for line in lines)
+    raw = np.frombuffer("".join(line.ljust(width, ".") for line in lines).encode("ascii"), dtype=np.uint8)
+    cells = raw.reshape(len(lines), width)
+    occupancy = np.isin(cells, np.frombuffer(OBSTACLE_CHARS, dtype=np.uint8))
+    start = start or _marker(cells, START_CHAR) or (0, 0)
+    goal = goal or _marker(cells, GOAL_CHAR) or (width - 1, len(lines) - 1)
+    return GridSpec.from_occupancy(occupancy, start, goal)
+
+
+def _marker(cells: np.ndarray, char: int) -> Optional[Position]:
+    ys, xs = np.nonzero(cells == char)
+    return (int(xs[0]), int(ys[0])) if xs.size else None
+
+
+def layout_from_image(path, start: Optional[Position] = None, goal: Optional[Position] = None, threshold: float = 0.5) -> GridSpec:
+    """Load a map image (one pixel per cell); pixels darker than `threshold` are obstacles."""
+    import matplotlib.image as mpimg  # optional at import time; only needed for image maps
+
+    img = np.asarray(mpimg.imread(str(path)), dtype=np.float32)
+    if img.max() > 1.0:  # 8-bit formats read as 0..255
+        img = img / 255.0
+    if img.ndim == 3:
+        img = img[..., :3].mean(axis=2)
+    occupancy = img < threshold
+    height, width = occupancy.shape
+    return GridSpec.from_occupancy(occupancy, start or (0, 0), goal or (width - 1, height - 1))
+
+
+def load_layout(path, start: Optional[Position] = None, goal: Optional[Position] = None) -> GridSpec:
+    """Load a layout from a text map, a `.npy` occupancy array or an image, by file suffix."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npy":
+        occupancy = np.load(path, mmap_mode="r") != 0
+        height, width = occupancy.shape
+        return GridSpec.from_occupancy(occupancy, start or (0, 0), goal or (width - 1, height - 1))
+    if suffix in (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff"):
+        return layout_from_image(path, start, goal)
+    return layout_from_text(path.read_text(encoding="utf-8"), start, goal)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .gridworld import GridSpec
+
+
+# Per-action (dx, dy) offsets, indexed by action: up(0), down(1), left(2), right(3)
+ACTION_DX = np.array([0, 0, -1, 1], dtype=np.int64)
+ACTION_DY = np.array([-1, 1, 0, 0], dtype=np.int64)
+
+_CACHE_SIZE = 8
+_MODEL_CACHE: "OrderedDict[Tuple, GridModel]" = OrderedDict()
+
+
+@dataclass(frozen=True)
+class GridModel:
+    """Dense tabular model of a GridWorld's deterministic dynamics.
+
+    All tables are read-only and indexed by discrete state `y * width + x`:
+
+    Attributes:
+      next_state: `int64[S, A]` successor state of taking action `a` in `s`.
+      reward: `float64[S, A]` environment reward for that transition.
+      collision: `bool[S, A]` whether the move hit an obstacle (and stayed put).
+      terminal: `bool[S]` whether the state ends the episode (the goal).
+    """
+    width: int
+    height: int
+    next_state: np.ndarray
+    reward: np.ndarray
+    collision: np.ndarray
+    terminal: np.ndarray
+
+    @property
+    def num_states(self) -> int:
+        return int(self.next_state.shape[0])
+
+    @property
+    def num_actions(self) -> int:
+        return int(self.next_state.shape[1])
+
+    def step(self, states, actions):
+        """Look up `(next_states, rewards, terminated, collision)` for a batch."""
+        next_states = self.next_state[states, actions]
+        return next_states, self.reward[states, actions], self.terminal[next_states], self.collision[states, actions]
+
+
+def grid_fingerprint(grid: GridSpec) -> str:
+    """Stable content hash of a `GridSpec` (size, start, goal and obstacle layout)."""
+    h = hashlib.sha1()
+    h.update(np.array([grid.width, grid.height, *grid.start, *grid.goal], dtype=np.int64).tobytes())
+    h.update(np.packbits(grid.occupancy).tobytes())
+    return h.hexdigest()
+
+
+def compile_grid_model(
+    grid: GridSpec,
+    step_penalty: float = -1.0,
+    obstacle_penalty: float = -5.0,
+    goal_reward: float = 10.0,
+) -> GridModel:
+    """Build (or fetch from cache) the transition/reward tables for `grid`.
+
+    Models are cached by `grid_fingerprint(grid)` and the reward parameters, so
+    environments sharing a layout share one set of tables.
+    """
+    key = (grid_fingerprint(grid), float(step_penalty), float(obstacle_penalty), float(goal_reward))
+    model = _MODEL_CACHE.get(key)
+    if model is not None:
+        _MODEL_CACHE.move_to_end(key)
+        return model
+
+    model = _build_model(grid, step_penalty, obstacle_penalty, goal_reward)
+    _MODEL_CACHE[key] = model
+    if len(_MODEL_CACHE) > _CACHE_SIZE:
+        _MODEL_CACHE.popitem(last=False)
+    return model
+
+
+def _build_model(grid: GridSpec, step_penalty: float, obstacle_penalty: float, goal_reward: float) -> GridModel:
+    width, height = grid.width, grid.height
+    states = np.arange(width * height, dtype=np.int64)
+    ys, xs = np.divmod(states, width)
+
+    nx = np.clip(xs[:, None] + ACTION_DX[None, :], 0, width - 1)
+    ny = np.clip(ys[:, None] + ACTION_DY[None, :], 0, height - 1)
+    collision = grid.occupancy[ny, nx]
+    # collision -> stay put
+    next_state = np.where(collision, states[:, None], ny * width + nx)
+
+    gx, gy = grid.goal
+    goal_state = gy * width + gx
+    terminal = states == goal_state
+
+    # Accumulate in the same order as the scalar env so rewards match bit for bit
+    reward = np.full(next_state.shape, step_penalty, dtype=np.float64)
+    reward[collision] += obstacle_penalty
+    reward[next_state == goal_state] += goal_reward
+
+    for arr in (next_state, reward, collision, terminal):
+        arr.flags.writeable = False
+    return GridModel(width, height, next_state, reward, collision, terminal)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from rl_project.spaces import Discrete
+
+from .gridworld import GridSpec, GridWorldEnv, Position, make_default_grid
+from .model import GridModel, compile_grid_model
+
+
+class MultiAgentGridWorldEnv:
+    """Warehouse floor where `num_agents` robots share one GridWorld layout.
+
+    All robots act simultaneously: `step` takes a joint action array and returns
+    per-agent observations, rewards, terminations and truncations (arrays of
+    length `num_agents`). Each robot follows the single-agent dynamics and
+    reward scheme of `GridWorldEnv`, towards its own goal (`goals`, default
+    `grid.goal` for everyone), plus robot-robot conflicts:
+
+      - vertex conflict: several robots moving into the same cell, or into a
+        cell whose robot stays put, are all blocked -- except that when the
+        cell is the goal of some of the movers (and nobody stays on it), the
+        lowest-indexed of those arrives, since it then leaves the floor;
+      - swap conflict: two robots exchanging cells are both blocked.
+
+    A blocked robot stays in place and receives `agent_collision_penalty`
+    (default: `obstacle_penalty`), like bumping into an obstacle. Blocking can
+    cascade (a robot following one that got blocked), so resolution is repeated
+    until no proposed move changes. Conflicts are found through a per-cell
+    robot-index array rather than pairwise checks, so a step costs O(num_agents)
+    per resolution round.
+
+    A robot that reaches its goal terminates and leaves the floor: it no longer
+    blocks others, its actions are ignored and its reward is 0 from then on.
+    The episode is over once every robot has terminated, or after
+    `max_episode_steps` joint steps, when the robots still on the floor are
+    truncated. `info["episode_step"]` counts the joint steps taken.
+    """
+    metadata = GridWorldEnv.metadata
+
+    def __init__(
+        self,
+        num_agents: int,
+        grid: Optional[GridSpec] = None,
+        starts: Optional[Sequence[Position]] = None,
+        goals: Optional[Sequence[Position]] = None,
+        step_penalty: float = -1.0,
+        obstacle_penalty: float = -5.0,
+        goal_reward: float = 10.0,
+        agent_collision_penalty: Optional[float] = None,
+        render_mode: Optional[str] = None,
+        max_episode_steps: Optional[int] = None,
+    ) -> None:
+        if num_agents <= 0:
+            raise ValueError(f"num_agents must be positive, got {num_agents}")
+        if max_episode_steps is not None and max_episode_steps <= 0:
+            raise ValueError(f"max_episode_steps must be positive, got {max_episode_steps}")
+        self.num_agents = int(num_agents)
+        self.grid = grid or make_default_grid()
+        self.step_penalty = step_penalty
+        self.obstacle_penalty = obstacle_penalty
+        self.goal_reward = goal_reward
+        self.agent_collision_penalty = obstacle_penalty if agent_collision_penalty is None else agent_collision_penalty
+        self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps
+
+        # Spaces describe a single robot, as in VectorGridWorldEnv
+        self.observation_space = Discrete(self.grid.width * self.grid.height)
+        self.action_space = Discrete(4)
+        self.model: GridModel = compile_grid_model(self.grid, step_penalty, obstacle_penalty, goal_reward)
+
+        self._starts = None if starts is None else self._to_states(starts, "starts")
+        self._goals = self._to_states(goals if goals is not None else [self.grid.goal] * self.num_agents, "goals")
+        self._rng = np.random.default_rng()
+
+        # Per-cell robot index (-1 = free); only entries touched in a step are reset
+        self._cell_agent = np.full(self.model.num_states, -1, dtype=np.int64)
+        self._cell_contested = np.zeros(self.model.num_states, dtype=bool)
+        self._states = np.empty(self.num_agents, dtype=np.int64)
+        self._terminated = np.zeros(self.num_agents, dtype=bool)
+        self._truncated = np.zeros(self.num_agents, dtype=bool)
+        self._elapsed_steps = 0
+        self._needs_reset = True
+
+    def _to_states(self, positions: Sequence[Position], name: str) -> np.ndarray:
+        pos = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        if len(pos) != self.num_agents:
+            raise ValueError(f"Expected {self.num_agents} {name}, got {len(pos)}")
+        xs, ys = pos[:, 0], pos[:, 1]
+        if np.any((xs < 0) | (xs >= self.grid.width) | (ys < 0) | (ys >= self.grid.height)):
+            raise ValueError(f"{name} outside the {self.grid.width}x{self.grid.height} grid")
+        if np.any(self.grid.occupancy[ys, xs]):
+            raise ValueError(f"{name} on an obstacle cell")
+        return ys * self.grid.width + xs
+
+    def reset(self, *, seed: Optional[int] = None, options: Optional[Dict] = None):
+        """Place the robots and return `(states, info)`.
+
+        Without explicit `starts` (constructor or `options["starts"]`), robot 0
+        starts at `grid.start` and the others at distinct random free cells
+        that are not a goal.
+        """
+        if seed is not None:
+            np.random.seed(seed)
+            self._rng = np.random.default_rng(seed)
+        options = options or {}
+        if "goals" in options:
+            self._goals = self._to_states(options["goals"], "goals")
+        starts = self._to_states(options["starts"], "starts") if "starts" in options else self._starts
+        if starts is None:
+            starts = self._random_starts()
+        if np.unique(starts).size != self.num_agents:
+            raise ValueError("Robots must start on distinct cells")
+
+        self._states = starts.copy()
+        self._terminated = self._states == self._goals
+        self._truncated.fill(False)
+        self._elapsed_steps = 0
+        self._needs_reset = bool(self._terminated.all())
+        return self._states.copy(), {}
+
+    def _random_starts(self) -> np.ndarray:
+        sx, sy = self.grid.start
+        first = sy * self.grid.width + sx
+        free = ~self.grid.occupancy.reshape(-1)
+        free[self._goals] = False
+        free[first] = False
+        candidates = np.flatnonzero(free)
+        if candidates.size < self.num_agents - 1:
+            raise ValueError(f"Not enough free cells for {self.num_agents} robots")
+        others = self._rng.choice(candidates, size=self.num_agents - 1, replace=False)
+        return np.concatenate([[first], others]).astype(np.int64)
+
+    # Gymnasium-style step, with per-agent arrays
+    def step(self, actions):
+        if self._needs_reset:
+            raise RuntimeError("Call reset() before step() after termination.")
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_agents,):
+            raise ValueError(f"Expected actions of shape ({self.num_agents},), got {actions.shape}")
+        if np.any((actions < 0) | (actions > 3)):
+            raise ValueError(f"Invalid action in batch: {actions[(actions < 0) | (actions > 3)][0]}")
+
+        active = np.flatnonzero(~self._terminated)
+        current = self._states[active]
+        act = actions[active]
+        proposed = self.model.next_state[current, act]
+        wall = self.model.collision[current, act]
+        blocked = self._resolve_conflicts(current, proposed, self._goals[active])
+        proposed[blocked] = current[blocked]
+
+        rewards = np.zeros(self.num_agents, dtype=np.float64)
+        reward = np.full(active.size, self.step_penalty, dtype=np.float64)
+        reward[wall] += self.obstacle_penalty
+        reward[blocked] += self.agent_collision_penalty
+        arrived = proposed == self._goals[active]
+        reward[arrived] += self.goal_reward
+        rewards[active] = reward
+
+        self._states[active] = proposed
+        self._terminated[active] = arrived
+        self._elapsed_steps += 1
+        if self.max_episode_steps is not None and self._elapsed_steps >= self.max_episode_steps:
+            self._truncated[active[~arrived]] = True
+            self._needs_reset = True
+        else:
+            self._needs_reset = bool(self._terminated.all())
+
+        collision = np.zeros(self.num_agents, dtype=bool)
+        agent_collision = np.zeros(self.num_agents, dtype=bool)
+        collision[active] = wall
+        agent_collision[active] = blocked
+        info: Dict = {"collision": collision, "agent_collision": agent_collision, "episode_step": self._elapsed_steps}
+        return self._states.copy(), rewards, self._terminated.copy(), self._truncated.copy(), info
+
+    def _resolve_conflicts(self, current: np.ndarray, proposed: np.ndarray, goals: np.ndarray) -> np.ndarray:
+        """Return a mask of robots whose proposed move is blocked by another robot.
+
+        `current`/`proposed`/`goals` are the cells of the robots still on the
+        floor. Each round scatters robot indices into the per-cell array: one
+        claimant per cell wins the write, so any robot that reads back another
+        index marks its cell as contested. On a contested cell nobody stays on,
+        the lowest-indexed claimant whose goal it is goes through (it terminates
+        there, so robots sharing a goal cannot deadlock). Other vertex and swap
+        conflicts are blocked and the blocked robots fall back to their current
+        cell, which may create new conflicts for the next round.
+        """
+        n = current.size
+        idx = np.arange(n, dtype=np.int64)
+        target = proposed.copy()
+        blocked = np.zeros(n, dtype=bool)
+        cell_agent, cell_contested = self._cell_agent, self._cell_contested
+
+        cell_agent[current] = idx  # who stands where before the step
+        occupant = cell_agent[target]
+        cell_agent[current] = -1
+        while True:
+            moving = target != current
+            # Vertex conflicts: more than one robot claims the cell
+            cell_agent[target] = idx
+            cell_contested[target[cell_agent[target] != idx]] = True
+            contested = cell_contested[target]
+            cell_agent[target] = -1
+            cell_contested[target] = False
+            arriving = np.flatnonzero(moving & contested & (target == goals))
+            if arriving.size:
+                cell_contested[target[~moving]] = True  # cells held by a robot staying put
+                cells, first = np.unique(target[arriving], return_index=True)  # lowest index per cell
+                winners = arriving[first][~cell_contested[cells]]
+                cell_contested[target[~moving]] = False
+                contested[winners] = False
+            # Swap conflicts: the robot standing in my target moves into my cell
+            swap = (occupant >= 0) & (occupant != idx)
+            swap[swap] = target[occupant[swap]] == current[swap]
+
+            newly = moving & (contested | swap)
+            if not newly.any():
+                return blocked
+            blocked |= newly
+            target[newly] = current[newly]
+            occupant[newly] = idx[newly]
+
+    def _state_to_pos(self, state: int) -> Position:
+        y, x = divmod(int(state), self.grid.width)
+        return (x, y)
+
+    @property
+    def positions(self) -> np.ndarray:
+        """`int64[num_agents, 2]` robot `(x, y)` positions."""
+        ys, xs = np.divmod(self._states, self.grid.width)
+        return np.stack([xs, ys], axis=1)
+
+    # Simple ANSI rendering for console: robots still on the floor are shown as 'A'
+    def render(self):
+        grid = np.where(self.grid.occupancy, "#", ".").astype(object)
+        goals_y, goals_x = np.divmod(self._goals, self.grid.width)
+        grid[goals_y, goals_x] = "G"
+        ys, xs = np.divmod(self._states[~self._terminated], self.grid.width)
+        grid[ys, xs] = "A"
+        return "\n".join(" ".join(map(str, row)) for row in grid)
+
+    # Utility for visualization (same encoding as GridWorldEnv.as_array)
+    def as_array(self) -> np.ndarray:
+        arr = np.where(self.grid.occupancy, -1, 0).reshape(-1)
+        arr[self._goals] = 2
+        arr[self._states[~self._terminated]] = 1
+        return arr.reshape(self.grid.height, self.grid.width)
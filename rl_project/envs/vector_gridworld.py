@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+from rl_project.spaces import Discrete
+
+from .gridworld import GridSpec, GridWorldEnv, make_default_grid
+from .model import GridModel, compile_grid_model
+
+
+class VectorGridWorldEnv:
+    """Batched GridWorld that steps `num_envs` independent copies per call.
+
+    Every sub-environment follows exactly the dynamics of `GridWorldEnv`, but
+    agent states live in a NumPy array and moves, collisions, goal rewards and
+    terminations for all copies are gathered from the shared `GridModel`
+    tables in one pass.
+
+    Finished sub-environments are reset automatically (Gymnasium vector-env
+    convention): the observation returned for them is already the start state,
+    and the terminal observation is reported in `info["final_observation"]`,
+    masked by `info["_final_observation"]`.
+
+    `max_episode_steps` truncates each sub-environment's episode as in
+    `GridWorldEnv`; `info["episode_step"]` holds the per-environment step
+    counts of the step just taken (before any auto-reset).
+
+    `observation_space` and `action_space` describe a single sub-environment,
+    so agents can be sized from them exactly as with `GridWorldEnv`.
+    """
+    metadata = GridWorldEnv.metadata
+
+    def __init__(
+        self,
+        num_envs: int,
+        grid: Optional[GridSpec] = None,
+        step_penalty: float = -1.0,
+        obstacle_penalty: float = -5.0,
+        goal_reward: float = 10.0,
+        render_mode: Optional[str] = None,
+        max_episode_steps: Optional[int] = None,
+    ) -> None:
+        if num_envs <= 0:
+            raise ValueError(f"num_envs must be positive, got {num_envs}")
+        if max_episode_steps is not None and max_episode_steps <= 0:
+            raise ValueError(f"max_episode_steps must be positive, got {max_episode_steps}")
+        self.num_envs = int(num_envs)
+        self.grid = grid or make_default_grid()
+        self.step_penalty = step_penalty
+        self.obstacle_penalty = obstacle_penalty
+        self.goal_reward = goal_reward
+        self.render_mode = render_mode
+        self.max_episode_steps = max_episode_steps
+
+        self.single_observation_space = Discrete(self.grid.width * self.grid.height)
+        self.single_action_space = Discrete(4)
+        self.observation_space = self.single_observation_space
+        self.action_space = self.single_action_space
+
+        self.model: GridModel = compile_grid_model(self.grid, step_penalty, obstacle_penalty, goal_reward)
+        sx, sy = self.grid.start
+        self._start_state = sy * self.grid.width + sx
+        self._states = np.full(self.num_envs, self._start_state, dtype=np.int64)
+        self._elapsed_steps = np.zeros(self.num_envs, dtype=np.int64)
+
+    def reset(self, *, seed: Optional[int] = None, options: Optional[Dict] = None):
+        if seed is not None:
+            np.random.seed(seed)
+        self._states.fill(self._start_state)
+        self._elapsed_steps.fill(0)
+        return self._states.copy(), {}
+
+    # Gymnasium step signature, batched over sub-environments
+    def step(self, actions):
+        actions = np.asarray(actions)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected actions of shape ({self.num_envs},), got {actions.shape}")
+        if np.any((actions < 0) | (actions > 3)):
+            raise ValueError(f"Invalid action in batch: {actions[(actions < 0) | (actions > 3)][0]}")
+
+        next_states, rewards, terminated, collision = self.model.step(self._states, actions)
+        self._elapsed_steps += 1
+        if self.max_episode_steps is None:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+        else:
+            truncated = self._elapsed_steps >= self.max_episode_steps
+        info: Dict = {"collision": collision, "episode_step": self._elapsed_steps.copy()}
+
+        self._states = next_states
+        done = terminated | truncated
+        if np.any(done):
+            info["final_observation"] = next_states.copy()
+            info["_final_observation"] = done
+            self._states[done] = self._start_state
+            self._elapsed_steps[done] = 0
+
+        return self._states.copy(), rewards, terminated, truncated, info
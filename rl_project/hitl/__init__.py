@@ -1,4 +1,5 @@
 from .feedback_manager import FeedbackManager, FeedbackConfig
+from .storage import JsonFeedbackStore, LogFeedbackStore
 
-__all__ = ["FeedbackManager", "FeedbackConfig"]
+__all__ = ["FeedbackManager", "FeedbackConfig", "JsonFeedbackStore", "LogFeedbackStore"]
 
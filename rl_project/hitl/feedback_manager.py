@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-import json
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .storage import open_store, read_json_scores, write_json_scores
 
 
 StateAction = Tuple[int, int]
@@ -13,6 +17,9 @@ StateAction = Tuple[int, int]
 class FeedbackConfig:
     file_path: Path
     beta: float = 0.5  # weight added to environment reward
+    storage: str = "log"  # "log": append-only binary log + snapshots; "json": legacy JSON file
+    compact_every: int = 100_000  # log records before folding them into a snapshot
+    server_address: Optional[str] = None  # "unix:/path.sock" or "host:port" of a shared FeedbackServer
 
 
 class FeedbackManager:
@@ -20,43 +27,89 @@ class FeedbackManager:
 
     Feedback is accumulated as integer scores per (state, action). The shaped
     reward is `env_reward + beta * score`.
+
+    By default events are appended to a compact binary log next to
+    `config.file_path` (see `storage.LogFeedbackStore`); an existing JSON file
+    there is imported on first use, and `export_json` / `import_json` convert
+    to and from the JSON format. With `config.server_address` set, events go
+    to a shared `FeedbackServer` instead and feedback from every connected
+    session is applied as it is committed.
+
+    Training loops should call `shaping_matrix` once and index the returned
+    dense `beta * score` array (or use `shaped_rewards` for batches); it is
+    updated in place by `add_feedback` (and by the server subscription).
+    Building the matrix and applying deltas share one lock (the remote
+    store's subscriber lock when there is one), so no update falls between
+    the snapshot a matrix is built from and the deltas applied to it.
     """
     def __init__(self, config: FeedbackConfig) -> None:
         self.config = config
         self.file_path = config.file_path
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
-        self._feedback: Dict[str, int] = {}
-        self._load()
-
-    def _key(self, state: int, action: int) -> str:
-        return f"{state}:{action}"
+        self._shaping: Optional[np.ndarray] = None
+        if config.server_address:
+            from .server import RemoteFeedbackStore
+            self._store = RemoteFeedbackStore(config.server_address, on_delta=self._apply_deltas)
+        else:
+            self._store = open_store(self.file_path, config.storage, config.compact_every)
+        self._lock = getattr(self._store, "lock", None) or threading.RLock()
 
     def add_feedback(self, state: int, action: int, label: int) -> None:
         # label: +1 like, -1 dislike
-        key = self._key(state, action)
-        self._feedback[key] = self._feedback.get(key, 0) + int(label)
-        self._save()
+        if getattr(self._store, "pushes_updates", False):
+            self._store.add(state, action, int(label))  # applied when the server pushes it back
+            return
+        with self._lock:
+            self._store.add(state, action, int(label))
+            self._apply_deltas(np.array([state]), np.array([action]), np.array([int(label)]))
+
+    def _apply_deltas(self, states: np.ndarray, actions: np.ndarray, deltas: np.ndarray) -> None:
+        with self._lock:
+            shaping = self._shaping
+            if shaping is None:
+                return  # already in the store; the matrix built later includes it
+            inside = (states >= 0) & (states < shaping.shape[0]) & (actions >= 0) & (actions < shaping.shape[1])
+            np.add.at(shaping, (states[inside], actions[inside]), self.config.beta * deltas[inside])
+
+    def shaping_matrix(self, num_states: int, num_actions: int) -> np.ndarray:
+        """Dense `float32[num_states, num_actions]` array of `beta * score`.
+
+        Built on first call and kept in sync with later `add_feedback` calls, so
+        callers may hold on to the returned array.
+        """
+        with self._lock:
+            if self._shaping is None or self._shaping.shape != (num_states, num_actions):
+                shaping = np.zeros((num_states, num_actions), dtype=np.float32)
+                states, actions, scores = self._store.to_arrays()
+                inside = (states < num_states) & (actions < num_actions)
+                np.add.at(shaping, (states[inside], actions[inside]), self.config.beta * scores[inside])
+                self._shaping = shaping
+            return self._shaping
+
+    def shaped_rewards(self, rewards: np.ndarray, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """Vectorized `shaped_reward` for a batch; requires `shaping_matrix` to have been built."""
+        if self._shaping is None:
+            raise RuntimeError("Call shaping_matrix(num_states, num_actions) before shaped_rewards().")
+        return np.asarray(rewards, dtype=np.float64) + self._shaping[states, actions]
 
     def get_feedback_score(self, state: int, action: int) -> float:
-        key = self._key(state, action)
-        return float(self._feedback.get(key, 0))
+        return float(self._store.score(state, action))
 
     def shaped_reward(self, env_reward: float, state: int, action: int) -> float:
+        if self._shaping is not None:
+            return float(env_reward + self._shaping.item(state, action))
         return float(env_reward + self.config.beta * self.get_feedback_score(state, action))
 
-    def _load(self) -> None:
-        if self.file_path.exists():
-            try:
-                data = json.loads(self.file_path.read_text())
-                if isinstance(data, dict):
-                    self._feedback = {str(k): int(v) for k, v in data.items()}
-            except Exception:
-                pass
-
-    def _save(self) -> None:
-        try:
-            self.file_path.write_text(json.dumps(self._feedback, ensure_ascii=False, indent=2))
-        except Exception:
-            pass
+    def export_json(self, path: Path) -> None:
+        """Write all scores in the `{"state:action": score}` JSON format."""
+        states, actions, scores = self._store.to_arrays()
+        write_json_scores(path, (((s, a), v) for s, a, v in zip(states.tolist(), actions.tolist(), scores.tolist())))
 
+    def import_json(self, path: Path) -> None:
+        """Add the scores from a JSON export on top of the current ones."""
+        for (state, action), score in read_json_scores(path).items():
+            if score:
+                self.add_feedback(state, action, score)
 
+    def close(self) -> None:
+        self._store.close()
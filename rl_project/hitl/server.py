@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .storage import LogFeedbackStore, open_store, unpack_key, pack_key
+
+
+# Wire protocol: one JSON object per line in each direction.
+#   {"op": "feedback", "events": [[state, action, label], ...]}  -> {"ok": true, "count": n}
+#   {"op": "score", "state": s, "action": a}                      -> {"ok": true, "score": v}
+#   {"op": "subscribe"}  -> {"op": "snapshot", "events": [[s, a, score], ...]} then
+#                           {"op": "delta", "events": [[s, a, delta], ...]} per commit
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """Parse `"unix:/path/to.sock"` or `"host:port"` into `(family, target)`."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class FeedbackServer:
+    """Single-writer feedback ingestion service with group commit.
+
+    Any number of clients (e.g. Streamlit sessions) send like/dislike events;
+    the server owns the only `LogFeedbackStore`, so no update is lost to racing
+    rewrites. Events that arrive while a commit is in flight are queued and
+    written together by the next one: a single append plus one fsync per
+    batch. Clients are acknowledged once their events are durable, and every
+    commit pushes the aggregated per-(state, action) score deltas to all
+    subscribers.
+
+    Args:
+      file_path: Feedback file, as in `FeedbackConfig.file_path`.
+      address: `"unix:/path/to.sock"` or `"host:port"` to listen on.
+      max_batch: Upper bound on queued requests folded into one commit.
+      compact_every: Log records before compaction into a snapshot.
+    """
+    def __init__(self, file_path: Path, address: str, max_batch: int = 4096, compact_every: int = 100_000) -> None:
+        self.file_path = Path(file_path)
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.address = address
+        self.max_batch = max_batch
+        self.store: LogFeedbackStore = open_store(self.file_path, "log", compact_every, fsync=True)
+        self._queue: Optional[asyncio.Queue] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._subscribers: Set[asyncio.StreamWriter] = set()
+        self.events_committed = 0
+        self.commits = 0
+
+    async def serve_forever(self) -> None:
+        self._queue = asyncio.Queue()
+        self._lock = asyncio.Lock()
+        family, target = parse_address(self.address)
+        if family == "unix":
+            Path(target).unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            host, port = target
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+        committer = asyncio.create_task(self._committer())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            committer.cancel()
+            self.store.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                    reply = await self._dispatch(msg, writer)
+                except Exception as e:  # malformed request: report and keep the connection
+                    reply = {"ok": False, "error": str(e)}
+                if reply is not None:
+                    writer.write(json.dumps(reply).encode() + b"\n")
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, msg: Dict, writer: asyncio.StreamWriter) -> Optional[Dict]:
+        op = msg.get("op")
+        if op == "feedback":
+            events = np.asarray(msg["events"], dtype=np.int64).reshape(-1, 3)
+            done = asyncio.get_running_loop().create_future()
+            await self._queue.put((events, done))
+            await done
+            return {"ok": True, "count": int(events.shape[0])}
+        if op == "score":
+            async with self._lock:
+                return {"ok": True, "score": self.store.score(int(msg["state"]), int(msg["action"]))}
+        if op == "subscribe":
+            async with self._lock:
+                states, actions, scores = self.store.to_arrays()
+                snapshot = np.stack([states, actions, scores], axis=1).tolist()
+                # send and register under the lock so no delta precedes or misses the snapshot
+                writer.write(json.dumps({"op": "snapshot", "events": snapshot}).encode() + b"\n")
+                self._subscribers.add(writer)
+            return None
+        raise ValueError(f"Unknown op: {op}")
+
+    async def _committer(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            events = np.concatenate([e for e, _ in batch])
+            try:
+                async with self._lock:
+                    await loop.run_in_executor(None, self.store.add_many, events[:, 0], events[:, 1], events[:, 2])
+            except Exception as e:
+                for _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+                continue
+            self.events_committed += events.shape[0]
+            self.commits += 1
+            for _, done in batch:
+                if not done.done():
+                    done.set_result(None)
+            self._broadcast(events)
+
+    def _broadcast(self, events: np.ndarray) -> None:
+        if not self._subscribers:
+            return
+        keys, inverse = np.unique(pack_key(events[:, 0], events[:, 1]), return_inverse=True)
+        deltas = np.bincount(inverse, weights=events[:, 2], minlength=keys.size).astype(np.int64)
+        states, actions = unpack_key(keys)
+        line = json.dumps({"op": "delta", "events": np.stack([states, actions, deltas], axis=1).tolist()}).encode() + b"\n"
+        for writer in list(self._subscribers):
+            if writer.is_closing():
+                self._subscribers.discard(writer)
+                continue
+            writer.write(line)
+
+
+def _connect(address: str) -> socket.socket:
+    family, target = parse_address(address)
+    if family == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.connect(target)
+    return sock
+
+
+class FeedbackClient:
+    """Blocking client for `FeedbackServer` (one request in flight at a time)."""
+    def __init__(self, address: str) -> None:
+        self._sock = _connect(address)
+        self._file = self._sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def _request(self, msg: Dict) -> Dict:
+        with self._lock:
+            self._file.write(json.dumps(msg).encode() + b"\n")
+            self._file.flush()
+            reply = json.loads(self._file.readline())
+        if not reply.get("ok", False):
+            raise RuntimeError(f"Feedback server error: {reply.get('error')}")
+        return reply
+
+    def add_feedback(self, state: int, action: int, label: int) -> None:
+        self.add_many([(state, action, label)])
+
+    def add_many(self, events: List[Tuple[int, int, int]]) -> None:
+        """Send events in one request; returns once they are durably committed."""
+        self._request({"op": "feedback", "events": [[int(s), int(a), int(l)] for s, a, l in events]})
+
+    def score(self, state: int, action: int) -> int:
+        return int(self._request({"op": "score", "state": int(state), "action": int(action)})["score"])
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+
+class RemoteFeedbackStore:
+    """Feedback store backed by a `FeedbackServer`.
+
+    Writes go to the server; a background subscription keeps a local copy of
+    all scores up to date (including other sessions' feedback) and reports
+    each batch of score deltas to `on_delta(states, actions, deltas)`. Both
+    happen under `lock`, so a reader holding it sees `to_arrays()` and the
+    deltas reported so far in agreement.
+    """
+    pushes_updates = True
+
+    def __init__(self, address: str, on_delta: Optional[Callable[[np.ndarray, np.ndarray, np.ndarray], None]] = None) -> None:
+        self.address = address
+        self.on_delta = on_delta
+        self._client = FeedbackClient(address)
+        self._scores: Dict[Tuple[int, int], int] = {}
+        self.lock = threading.RLock()
+        self._ready = threading.Event()
+        self._sub_sock = _connect(address)
+        self._thread = threading.Thread(target=self._listen, name="feedback-subscriber", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=10.0)
+
+    def _listen(self) -> None:
+        f = self._sub_sock.makefile("rwb")
+        try:
+            f.write(b'{"op": "subscribe"}\n')
+            f.flush()
+            for line in f:
+                msg = json.loads(line)
+                events = np.asarray(msg.get("events", []), dtype=np.int64).reshape(-1, 3)
+                if msg.get("op") == "snapshot":
+                    with self.lock:
+                        self._scores = {(s, a): v for s, a, v in events.tolist()}
+                    self._ready.set()
+                elif msg.get("op") == "delta":
+                    with self.lock:
+                        for s, a, d in events.tolist():
+                            self._scores[(s, a)] = self._scores.get((s, a), 0) + d
+                        if self.on_delta is not None and events.size:
+                            self.on_delta(events[:, 0], events[:, 1], events[:, 2])
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._ready.set()
+
+    def add(self, state: int, action: int, label: int) -> None:
+        self._client.add_feedback(state, action, label)
+
+    def score(self, state: int, action: int) -> int:
+        return self._scores.get((int(state), int(action)), 0)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self.lock:
+            items = list(self._scores.items())
+        if not items:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+        keys = np.array([k for k, _ in items], dtype=np.int64)
+        return keys[:, 0], keys[:, 1], np.array([v for _, v in items], dtype=np.int64)
+
+    def close(self) -> None:
+        self._client.close()
+        try:
+            self._sub_sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sub_sock.close()
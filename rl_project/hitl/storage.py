@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+
+StateAction = Tuple[int, int]
+
+# Log file layout: 16-byte header (magic, epoch) followed by fixed-size records
+_LOG_MAGIC = b"RLFBLOG1"
+_LOG_HEADER = struct.Struct("<8sQ")
+_RECORD = struct.Struct("<qqqI")  # state, action, label, crc32 of the first 24 bytes
+_RECORD_DTYPE = np.dtype([("state", "<i8"), ("action", "<i8"), ("label", "<i8"), ("crc", "<u4")])
+_SNAPSHOT_DTYPE = np.dtype([("key", "<i8"), ("score", "<i8")])
+_SNAPSHOT_RE = re.compile(r"\.snap-(\d+)\.npy$")
+
+
+def pack_key(state, action):
+    """Combine state and action into one sortable int64 key (action in the low 32 bits)."""
+    return (np.asarray(state, dtype=np.int64) << 32) | np.asarray(action, dtype=np.int64)
+
+
+def unpack_key(key) -> Tuple[np.ndarray, np.ndarray]:
+    key = np.asarray(key, dtype=np.int64)
+    return key >> 32, key & 0xFFFFFFFF
+
+
+def read_json_scores(path: Path) -> Dict[StateAction, int]:
+    """Read the legacy `{"state:action": score}` JSON format."""
+    data = json.loads(Path(path).read_text())
+    scores: Dict[StateAction, int] = {}
+    if isinstance(data, dict):
+        for k, v in data.items():
+            s, a = str(k).split(":")
+            scores[(int(s), int(a))] = int(v)
+    return scores
+
+
+def write_json_scores(path: Path, scores: Iterable[Tuple[StateAction, int]]) -> None:
+    """Write scores in the legacy `{"state:action": score}` JSON format."""
+    data = {f"{s}:{a}": int(v) for (s, a), v in scores}
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def _replace_atomically(path: Path, write) -> None:
+    """Write `path` through a uniquely named temp file in the same directory."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates owner-only files
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class JsonFeedbackStore:
+    """Legacy store: a dict of scores rewritten to a JSON file on every change."""
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self._scores: Dict[StateAction, int] = {}
+        if self.file_path.exists():
+            try:
+                self._scores = read_json_scores(self.file_path)
+            except Exception:
+                pass
+
+    def add(self, state: int, action: int, label: int) -> None:
+        key = (int(state), int(action))
+        self._scores[key] = self._scores.get(key, 0) + int(label)
+        try:
+            write_json_scores(self.file_path, self._scores.items())
+        except Exception:
+            pass
+
+    def score(self, state: int, action: int) -> int:
+        return self._scores.get((int(state), int(action)), 0)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if not self._scores:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+        keys = np.array(list(self._scores), dtype=np.int64)
+        return keys[:, 0], keys[:, 1], np.fromiter(self._scores.values(), dtype=np.int64, count=len(self._scores))
+
+    def close(self) -> None:
+        pass
+
+
+class LogFeedbackStore:
+    """Append-only binary log plus compacted, memory-mapped snapshots.
+
+    Every event is one fixed-size, CRC-checked record appended to
+    `<base>.log`, so adding feedback costs O(1) I/O. Once the log holds
+    `compact_every` records it is folded into a sorted sparse snapshot
+    `<base>.snap-<epoch>.npy` of `(key, score)` rows, which is opened with
+    `mmap_mode="r"` and queried by binary search.
+
+    Crash safety: a torn trailing record fails its CRC and is truncated on
+    load. Snapshots and logs carry an epoch; compaction writes the new snapshot
+    before rotating the log, so a crash in between is detected (log epoch one
+    behind the snapshot) and the already-folded log is discarded instead of
+    replayed twice.
+
+    Several processes may open the same store: opening, appending and
+    compacting hold an exclusive `flock` on `<base>.lock`. Compaction re-reads
+    the log from disk first, so records appended by other writers are folded
+    in, and a writer whose log was rotated underneath it reloads the new
+    snapshot and log before its next append. Other writers' feedback becomes
+    visible to a process at those reloads.
+
+    `import_json` names a legacy JSON file imported (under the lock) when the
+    store is created from scratch.
+    """
+    def __init__(
+        self,
+        base_path: Path,
+        compact_every: int = 100_000,
+        fsync: bool = False,
+        import_json: Optional[Path] = None,
+    ) -> None:
+        self.base_path = base_path
+        self.log_path = base_path.with_name(base_path.name + ".log")
+        self.lock_path = base_path.with_name(base_path.name + ".lock")
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._lock_file = self.lock_path.open("a+b")
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        with self._locked():
+            fresh = not self.log_path.exists() and not any(
+                base_path.parent.glob(base_path.name + ".snap-*.npy"))
+            self._epoch, self._snapshot = self._load_snapshot()
+            self._pending: Dict[int, int] = {}  # key -> score delta since the snapshot
+            self._log_records = 0
+            self._log = self._open_log()
+            if fresh and import_json is not None and import_json.exists():
+                self._import_json(import_json)
+
+    # -- public API --------------------------------------------------------
+    def add(self, state: int, action: int, label: int) -> None:
+        self.add_many(np.array([state]), np.array([action]), np.array([label]))
+
+    def add_many(self, states: np.ndarray, actions: np.ndarray, labels: np.ndarray) -> None:
+        """Append a batch of events with a single write (and fsync, if enabled)."""
+        records = np.empty(len(states), dtype=_RECORD_DTYPE)
+        records["state"] = states
+        records["action"] = actions
+        records["label"] = labels
+        raw = records.tobytes()
+        step = _RECORD_DTYPE.itemsize
+        for i in range(len(records)):
+            records["crc"][i] = zlib.crc32(raw[i * step:i * step + 24])
+        with self._locked():
+            if self._log_rotated():
+                self._reload()
+            self._log.write(records.tobytes())
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._apply(records)
+            self._log_records += len(records)
+            if self._log_records >= self.compact_every:
+                self.compact()
+
+    def score(self, state: int, action: int) -> int:
+        key = (int(state) << 32) | int(action)
+        return self._pending.get(key, 0) + self._snapshot_score(key)
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        keys, scores = self._merged()
+        states, actions = unpack_key(keys)
+        return states, actions, scores
+
+    def compact(self) -> None:
+        """Fold the log into a new snapshot and start an empty log."""
+        with self._locked():
+            self._reload()  # fold what every writer appended, not just our own records
+            keys, scores = self._merged()
+            nonzero = scores != 0
+            snapshot = np.empty(int(nonzero.sum()), dtype=_SNAPSHOT_DTYPE)
+            snapshot["key"] = keys[nonzero]
+            snapshot["score"] = scores[nonzero]
+
+            new_epoch = self._epoch + 1
+            new_path = self._snapshot_path(new_epoch)
+            _replace_atomically(new_path, lambda f: np.save(f, snapshot))
+
+            old_path = self._snapshot_path(self._epoch)
+            self._log.close()
+            self._epoch = new_epoch
+            self._snapshot = np.load(new_path, mmap_mode="r") if snapshot.size else snapshot
+            self._pending = {}
+            self._log_records = 0
+            self._log = self._open_log(rotate=True)
+            old_path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        self._log.close()
+        self._lock_file.close()
+
+    # -- internals ---------------------------------------------------------
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the store files; re-entrant within a process."""
+        with self._thread_lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _log_rotated(self) -> bool:
+        """True if another writer replaced `log_path` since we opened it."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return True
+        return not os.path.samestat(st, os.fstat(self._log.fileno()))
+
+    def _reload(self) -> None:
+        """Rebuild the in-memory state from the newest snapshot and the log on disk."""
+        self._log.close()
+        self._epoch, self._snapshot = self._load_snapshot()
+        self._pending = {}
+        self._log_records = 0
+        self._log = self._open_log()
+
+    def _import_json(self, file_path: Path) -> None:
+        try:
+            scores = read_json_scores(file_path)
+        except Exception:
+            scores = {}
+        if scores:
+            sa = np.array(list(scores), dtype=np.int64)
+            self.add_many(sa[:, 0], sa[:, 1], np.fromiter(scores.values(), dtype=np.int64, count=len(scores)))
+            self.compact()
+
+    def _snapshot_path(self, epoch: int) -> Path:
+        return self.base_path.with_name(f"{self.base_path.name}.snap-{epoch}.npy")
+
+    def _load_snapshot(self) -> Tuple[int, np.ndarray]:
+        epochs = []
+        for p in self.base_path.parent.glob(self.base_path.name + ".snap-*.npy"):
+            m = _SNAPSHOT_RE.search(p.name)
+            if m:
+                epochs.append(int(m.group(1)))
+        if not epochs:
+            return 0, np.empty(0, dtype=_SNAPSHOT_DTYPE)
+        epoch = max(epochs)
+        for stale in epochs:
+            if stale != epoch:
+                self._snapshot_path(stale).unlink(missing_ok=True)
+        return epoch, np.load(self._snapshot_path(epoch), mmap_mode="r")
+
+    def _open_log(self, rotate: bool = False):
+        if not rotate and self.log_path.exists():
+            with self.log_path.open("rb") as f:
+                header = f.read(_LOG_HEADER.size)
+            magic, epoch = _LOG_HEADER.unpack(header) if len(header) == _LOG_HEADER.size else (b"", -1)
+            if magic == _LOG_MAGIC and epoch == self._epoch:
+                self._replay()
+                return self.log_path.open("ab")
+            # Otherwise the log was already folded into the snapshot (crash
+            # during compaction) or is unreadable: start a fresh one.
+        header = _LOG_HEADER.pack(_LOG_MAGIC, self._epoch)
+        _replace_atomically(self.log_path, lambda f: f.write(header))
+        return self.log_path.open("ab")
+
+    def _replay(self) -> None:
+        data = self.log_path.read_bytes()
+        body = memoryview(data)[_LOG_HEADER.size:]
+        count = len(body) // _RECORD.size
+        valid = 0
+        for i in range(count):
+            start = i * _RECORD.size
+            crc = _RECORD.unpack_from(body, start)[3]
+            if zlib.crc32(body[start:start + 24]) != crc:
+                break
+            valid += 1
+        good_bytes = _LOG_HEADER.size + valid * _RECORD.size
+        if good_bytes != len(data):
+            # torn or corrupt tail: drop it so new records stay aligned
+            with self.log_path.open("r+b") as f:
+                f.truncate(good_bytes)
+        records = np.frombuffer(body[:valid * _RECORD.size], dtype=_RECORD_DTYPE)
+        self._apply(records)
+        self._log_records = valid
+
+    def _apply(self, records: np.ndarray) -> None:
+        keys = pack_key(records["state"], records["action"]).tolist()
+        for key, label in zip(keys, records["label"].tolist()):
+            self._pending[key] = self._pending.get(key, 0) + label
+
+    def _snapshot_score(self, key: int) -> int:
+        snap = self._snapshot
+        if not snap.size:
+            return 0
+        keys = snap["key"]
+        i = int(np.searchsorted(keys, key))
+        if i < keys.size and keys[i] == key:
+            return int(snap["score"][i])
+        return 0
+
+    def _merged(self) -> Tuple[np.ndarray, np.ndarray]:
+        snap_keys = np.asarray(self._snapshot["key"])
+        snap_scores = np.asarray(self._snapshot["score"])
+        if not self._pending:
+            return snap_keys.copy(), snap_scores.copy()
+        pend_keys = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        pend_scores = np.fromiter(self._pending.values(), dtype=np.int64, count=len(self._pending))
+        keys, inverse = np.unique(np.concatenate([snap_keys, pend_keys]), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate([snap_scores, pend_scores]), minlength=keys.size)
+        return keys, scores.astype(np.int64)
+
+
+def open_store(file_path: Path, storage: str, compact_every: int = 100_000, fsync: bool = False):
+    """Open the feedback store for `file_path` (`storage` is "log" or "json").
+
+    For the log store, `file_path` names the legacy JSON file; the binary files
+    live next to it under the same stem, and an existing JSON file is imported
+    the first time the log store is opened.
+    """
+    if storage == "json":
+        return JsonFeedbackStore(file_path)
+    if storage != "log":
+        raise ValueError(f"Unknown feedback storage: {storage}")
+    return LogFeedbackStore(file_path.with_suffix(""), compact_every=compact_every, fsync=fsync,
+                            import_json=file_path)
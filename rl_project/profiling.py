@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import gc
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+
+class Profiler:
+    """Opt-in per-phase timers, throughput timeline and allocation counters.
+
+    Hot loops take an optional profiler and only run their instrumented variant
+    when one is given, so training without `--profile` is untouched. Timing is
+    chained with `perf_counter_ns`:
+
+        t = time.perf_counter_ns()
+        action = agent.select_action(state)
+        t = profiler.lap("select_action", t)
+        ...
+        profiler.count_steps(1)
+
+    Allocation counters are cheap (garbage-collector runs and net allocated
+    blocks); `track_allocations=True` additionally runs `tracemalloc` to report
+    the peak traced memory and the top allocation sites, at a noticeable cost to
+    the timings themselves.
+
+    Args:
+      track_allocations: Enable `tracemalloc` between `start` and `stop`.
+      sample_every: Seconds between steps/sec timeline samples.
+      top_sites: Allocation sites kept in the report.
+    """
+    def __init__(self, track_allocations: bool = False, sample_every: float = 1.0, top_sites: int = 10) -> None:
+        self.track_allocations = track_allocations
+        self.sample_every = sample_every
+        self.top_sites = top_sites
+        self.phases: Dict[str, List[int]] = {}  # phase -> [total_ns, calls]
+        self.steps = 0
+        self.timeline: List[List[float]] = []  # [elapsed_s, steps_per_s] per sample
+        self.allocations: Dict = {}
+        self.elapsed: Optional[float] = None  # set by `stop`
+        self._t0 = 0
+        self._last_sample = (0, 0)  # (ns, steps)
+        self._started_tracing = False
+        self._blocks0 = 0
+        self._gc0: List[int] = []
+
+    def start(self) -> "Profiler":
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._blocks0 = sys.getallocatedblocks()
+        self._gc0 = [s["collections"] for s in gc.get_stats()]
+        self._t0 = time.perf_counter_ns()
+        self._last_sample = (self._t0, self.steps)
+        return self
+
+    def lap(self, phase: str, t0: int) -> int:
+        """Charge the time since `t0` to `phase`; returns the new timestamp."""
+        now = time.perf_counter_ns()
+        entry = self.phases.get(phase)
+        if entry is None:
+            entry = self.phases[phase] = [0, 0]
+        entry[0] += now - t0
+        entry[1] += 1
+        return now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a coarse block (e.g. pre-training) as one phase call."""
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.lap(name, t0)
+
+    def count_steps(self, n: int = 1) -> None:
+        """Record `n` env steps; samples steps/sec every `sample_every` seconds."""
+        self.steps += n
+        now = time.perf_counter_ns()
+        last_ns, last_steps = self._last_sample
+        if now - last_ns >= self.sample_every * 1e9:
+            self.timeline.append([(now - self._t0) / 1e9, (self.steps - last_steps) * 1e9 / (now - last_ns)])
+            self._last_sample = (now, self.steps)
+
+    def stop(self) -> "Profiler":
+        self.elapsed = (time.perf_counter_ns() - self._t0) / 1e9
+        gc_runs = [s["collections"] - c0 for s, c0 in zip(gc.get_stats(), self._gc0)]
+        self.allocations = {
+            "net_blocks": sys.getallocatedblocks() - self._blocks0,
+            "gc_collections": gc_runs,
+        }
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, "<frozen *>"),  # import machinery
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            _, peak = tracemalloc.get_traced_memory()
+            self.allocations["peak_traced_mb"] = peak / 1e6
+            self.allocations["top_sites"] = [
+                {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "blocks": s.count, "kib": s.size / 1024}
+                for s in snapshot.statistics("lineno")[:self.top_sites]
+            ]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return self
+
+    def merge(self, other: Dict) -> None:
+        """Add the phase totals and step count of another profiler's `to_dict()`."""
+        for name, p in other["phases"].items():
+            entry = self.phases.setdefault(name, [0, 0])
+            entry[0] += int(p["total_s"] * 1e9)
+            entry[1] += int(p["calls"])
+        self.steps += int(other["steps"])
+
+    def to_dict(self) -> Dict:
+        elapsed = self.elapsed if self.elapsed is not None else (time.perf_counter_ns() - self._t0) / 1e9
+        total_ns = sum(ns for ns, _ in self.phases.values()) or 1
+        return {
+            "elapsed_s": elapsed,
+            "steps": self.steps,
+            "steps_per_s": self.steps / elapsed if elapsed > 0 else 0.0,
+            "phases": {
+                name: {"total_s": ns / 1e9, "share": ns / total_ns, "calls": calls,
+                       "mean_us": ns / calls / 1e3 if calls else 0.0}
+                for name, (ns, calls) in sorted(self.phases.items(), key=lambda kv: -kv[1][0])
+            },
+            "timeline": self.timeline,
+            "allocations": self.allocations,
+        }
+
+    def report(self) -> str:
+        d = self.to_dict()
+        lines = [f"Profile: {d['elapsed_s']:.2f}s, {d['steps']} steps ({d['steps_per_s']:,.0f} steps/s)",
+                 f"  {'phase':<16}{'total s':>10}{'share':>8}{'calls':>12}{'mean us':>10}"]
+        for name, p in d["phases"].items():
+            lines.append(f"  {name:<16}{p['total_s']:>10.3f}{p['share']:>8.1%}{p['calls']:>12}{p['mean_us']:>10.2f}")
+        if d["timeline"]:
+            rates = [rate for _, rate in d["timeline"]]
+            lines.append(f"  steps/s over time: min {min(rates):,.0f}, max {max(rates):,.0f}, "
+                         f"last {rates[-1]:,.0f} ({len(rates)} samples)")
+        alloc = d["allocations"]
+        if alloc:
+            lines.append(f"  allocations: net blocks {alloc['net_blocks']:+d}, gc collections per generation {alloc['gc_collections']}")
+            if "peak_traced_mb" in alloc:
+                lines.append(f"  traced peak {alloc['peak_traced_mb']:.1f} MB; top sites:")
+                lines.extend(f"    {s['blocks']:>8} blocks {s['kib']:>10.1f} KiB  {s['site']}" for s in alloc["top_sites"])
+        return "\n".join(lines)
+
+
+def maybe_profiler(enabled: bool, track_allocations: bool = False) -> Optional[Profiler]:
+    """A started `Profiler` when `enabled`, else None (the zero-overhead path)."""
+    return Profiler(track_allocations=track_allocations).start() if enabled else None
@@ -0,0 +1,3 @@
+from .policy_server import LatencyStats, PolicyClient, PolicyServer
+
+__all__ = ["LatencyStats", "PolicyClient", "PolicyServer"]
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from rl_project.agents import QLearningAgent
+from rl_project.agents.checkpoint import load_checkpoint
+from rl_project.hitl.server import parse_address
+
+
+# Wire protocol: one JSON object per line in each direction (same framing as the feedback server).
+#   {"op": "act", "states": [s, ...]}   -> {"ok": true, "actions": [a, ...], "version": v}
+#   {"op": "stats"}                     -> {"ok": true, "stats": {...}}
+#   {"op": "reload", "path": "..."}     -> {"ok": true, "version": v}   (path optional; must be in the
+#                                          directory of the checkpoint the server was started with)
+# Requests on one connection may be pipelined; replies come back in request order.
+
+
+class LatencyStats:
+    """Ring buffer of recent request latencies plus throughput counters."""
+    def __init__(self, window: int = 65_536) -> None:
+        self._latencies = np.zeros(window, dtype=np.float64)
+        self._count = 0
+        self.requests = 0
+        self.states = 0
+        self.batches = 0
+        self._started = time.perf_counter()
+
+    def record_batch(self, latencies: np.ndarray, num_states: int) -> None:
+        n = latencies.size
+        window = self._latencies.size
+        idx = (self._count + np.arange(n)) % window
+        self._latencies[idx] = latencies
+        self._count += n
+        self.requests += n
+        self.states += num_states
+        self.batches += 1
+
+    def reset(self) -> None:
+        self._count = self.requests = self.states = self.batches = 0
+        self._started = time.perf_counter()
+
+    def summary(self) -> Dict[str, float]:
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        recent = self._latencies[:min(self._count, self._latencies.size)]
+        p50, p99 = (np.percentile(recent, [50, 99]) * 1e3).tolist() if recent.size else (0.0, 0.0)
+        return {
+            "requests": float(self.requests),
+            "states": float(self.states),
+            "batches": float(self.batches),
+            "mean_batch_requests": self.requests / self.batches if self.batches else 0.0,
+            "p50_ms": p50,
+            "p99_ms": p99,
+            "requests_per_s": self.requests / elapsed,
+            "states_per_s": self.states / elapsed,
+            "elapsed_s": elapsed,
+        }
+
+
+class PolicyServer:
+    """Greedy-action inference service over a Q-table checkpoint.
+
+    Requests from all connections go into one queue; a batcher task takes
+    whatever is waiting (up to `max_batch` states, waiting at most
+    `max_delay_ms` after the first request for more) and answers the whole
+    micro-batch with a single vectorized argmax. The checkpoint is memory-mapped
+    read-only, so several servers can share it.
+
+    `reload` swaps in a new checkpoint between batches: requests already
+    batched finish on the old table, later ones use the new one, and nothing is
+    dropped. With `watch_interval > 0` the checkpoint file is polled and
+    reloaded whenever it is replaced (e.g. by periodic training checkpoints,
+    which are written atomically). Over the wire, `reload` only accepts
+    checkpoints in the directory of the one the server was started with, so
+    clients cannot make it map arbitrary files.
+
+    Args:
+      checkpoint: Path written by `save_checkpoint`.
+      address: `"unix:/path/to.sock"` or `"host:port"` to listen on.
+      max_batch: Upper bound on states answered by one argmax.
+      max_delay_ms: Extra time to wait for a batch to fill (0: batch only what
+        is already queued, lowest latency).
+      watch_interval: Seconds between checks of the checkpoint file (0: off).
+    """
+    def __init__(
+        self,
+        checkpoint,
+        address: str,
+        max_batch: int = 8192,
+        max_delay_ms: float = 0.0,
+        watch_interval: float = 0.0,
+    ) -> None:
+        self.checkpoint = Path(checkpoint)
+        self.checkpoint_dir = self.checkpoint.resolve().parent
+        self.address = address
+        self.max_batch = int(max_batch)
+        self.max_delay = max_delay_ms / 1e3
+        self.watch_interval = watch_interval
+        self.agent: QLearningAgent = load_checkpoint(self.checkpoint, mode="r")
+        self.version = 1
+        self._file_id = self._stat_id(self.checkpoint)
+        self.stats = LatencyStats()
+        self._queue: Optional[asyncio.Queue] = None
+
+    @staticmethod
+    def _stat_id(path: Path):
+        st = os.stat(path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _client_checkpoint(self, path) -> Optional[Path]:
+        """Validate a `reload` path sent by a client (None: the current checkpoint)."""
+        if path is None:
+            return None
+        resolved = (self.checkpoint_dir / str(path)).resolve()  # relative paths are taken from that directory
+        if resolved.parent != self.checkpoint_dir:
+            raise ValueError(f"reload path must be a checkpoint in {self.checkpoint_dir}")
+        return resolved
+
+    def reload(self, path=None) -> int:
+        """Map a new checkpoint and make it current; returns the new version."""
+        path = Path(path) if path is not None else self.checkpoint
+        agent = load_checkpoint(path, mode="r")
+        if (agent.num_states, agent.num_actions) != (self.agent.num_states, self.agent.num_actions):
+            raise ValueError(f"Checkpoint shape {(agent.num_states, agent.num_actions)} does not match the served table")
+        self.checkpoint = path
+        self._file_id = self._stat_id(path)
+        self.agent = agent  # single reference swap, seen by the next batch
+        self.version += 1
+        return self.version
+
+    async def serve_forever(self) -> None:
+        self._queue = asyncio.Queue()
+        family, target = parse_address(self.address)
+        if family == "unix":
+            Path(target).unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            host, port = target
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+        tasks = [asyncio.create_task(self._batcher())]
+        if self.watch_interval > 0:
+            tasks.append(asyncio.create_task(self._watcher()))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        replies: asyncio.Queue = asyncio.Queue()
+        responder = asyncio.create_task(self._respond(replies, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await replies.put(self._dispatch(line))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await replies.put(None)
+            await responder
+            writer.close()
+
+    async def _respond(self, replies: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        """Write replies in request order as their futures complete."""
+        while True:
+            pending = await replies.get()
+            if pending is None:
+                return
+            try:
+                reply = await pending
+            except Exception as e:  # malformed request: report and keep the connection
+                reply = {"ok": False, "error": str(e)}
+            try:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                if replies.empty():
+                    await writer.drain()
+            except ConnectionError:
+                return
+
+    def _dispatch(self, line: bytes) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        try:
+            msg = json.loads(line)
+            op = msg.get("op")
+            if op == "act":
+                states = np.asarray(msg["states"], dtype=np.int64).reshape(-1)
+                if states.size and (states.min() < 0 or states.max() >= self.agent.num_states):
+                    raise ValueError(f"state out of range [0, {self.agent.num_states})")
+                self._queue.put_nowait((states, done, time.perf_counter()))
+            elif op == "stats":
+                done.set_result({"ok": True, "stats": {**self.stats.summary(), "version": self.version}})
+            elif op == "reload":
+                done.set_result({"ok": True, "version": self.reload(self._client_checkpoint(msg.get("path")))})
+            else:
+                raise ValueError(f"Unknown op: {op}")
+        except Exception as e:
+            done.set_exception(e)
+        return done
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = batch[0][0].size
+            deadline = loop.time() + self.max_delay
+            while size < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                size += item[0].size
+
+            agent, version = self.agent, self.version
+            states = np.concatenate([s for s, _, _ in batch])
+            actions = agent.greedy_actions(states).tolist()
+            now = time.perf_counter()
+            offset = 0
+            for s, done, _ in batch:
+                if not done.done():
+                    done.set_result({"ok": True, "actions": actions[offset:offset + s.size], "version": version})
+                offset += s.size
+            self.stats.record_batch(now - np.array([t for _, _, t in batch]), states.size)
+
+    async def _watcher(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            try:
+                if self._stat_id(self.checkpoint) != self._file_id:
+                    self.reload()
+            except (OSError, ValueError):
+                pass  # mid-replace or incompatible file: keep serving the current table
+
+
+class PolicyClient:
+    """Blocking client for `PolicyServer` (one request in flight at a time)."""
+    def __init__(self, address: str) -> None:
+        family, target = parse_address(address)
+        if family == "unix":
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.connect(target)
+        self._file = self._sock.makefile("rwb")
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def _request(self, msg: Dict) -> Dict:
+        with self._lock:
+            self._file.write(json.dumps(msg).encode() + b"\n")
+            self._file.flush()
+            reply = json.loads(self._file.readline())
+        if not reply.get("ok", False):
+            raise RuntimeError(f"Policy server error: {reply.get('error')}")
+        return reply
+
+    def act(self, state: int) -> int:
+        return self.act_batch([state])[0]
+
+    def act_batch(self, states: Sequence[int]) -> List[int]:
+        reply = self._request({"op": "act", "states": [int(s) for s in states]})
+        self.version = reply["version"]
+        return reply["actions"]
+
+    def stats(self) -> Dict[str, float]:
+        return self._request({"op": "stats"})["stats"]
+
+    def reload(self, path=None) -> int:
+        msg = {"op": "reload"} if path is None else {"op": "reload", "path": str(path)}
+        return int(self._request(msg)["version"])
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
@@ -1,6 +1,15 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
 
 # Ensure project root on sys.path
 import sys
@@ -8,35 +17,157 @@ root = str(Path(__file__).resolve().parents[1])
 if root not in sys.path:
     sys.path.insert(0, root)
 
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
 # LlamaIndex imports with version-compatible fallback
 try:
     from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
-    from llama_index.core.embeddings import resolve_embed_model
+    from llama_index.core.embeddings import MockEmbedding, resolve_embed_model
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.core.schema import MetadataMode
     def _get_embed_model():
-        return resolve_embed_model("local:sentence-transformers/all-MiniLM-L6-v2")
+        return resolve_embed_model(f"local:{EMBED_MODEL}")
 except Exception:
     from llama_index import SimpleDirectoryReader, VectorStoreIndex  # type: ignore
+    from llama_index.embeddings import MockEmbedding  # type: ignore
+    from llama_index.node_parser import SentenceSplitter  # type: ignore
+    from llama_index.schema import MetadataMode  # type: ignore
     try:
         from llama_index.embeddings.huggingface import HuggingFaceEmbedding  # type: ignore
     except Exception as e:  # pragma: no cover
         raise ImportError("Cannot import LlamaIndex embeddings. Please upgrade llama-index.") from e
     def _get_embed_model():
-        return HuggingFaceEmbedding(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        return HuggingFaceEmbedding(model_name=EMBED_MODEL)
+
+
+class EmbeddingCache:
+    """Content-addressed store of chunk embeddings.
+
+    Keys are SHA-256 digests of the exact text sent to the embedding model, so
+    an unchanged chunk is never embedded twice, wherever it moves. The cache is
+    two files under `cache_dir`: `embeddings.npy` (float32 rows) and
+    `embeddings.json` (model name and the key of each row), both replaced
+    atomically on `save`. A cache written for another model is ignored.
+    """
+    def __init__(self, cache_dir: Path, model: str) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.model = model
+        self.vectors: Dict[str, np.ndarray] = {}
+        meta_path = self.cache_dir / "embeddings.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("model") == model:
+                matrix = np.load(self.cache_dir / "embeddings.npy", mmap_mode="r")
+                self.vectors = {key: matrix[i] for i, key in enumerate(meta["keys"])}
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def save(self, keys: List[str]) -> None:
+        """Persist the entries for `keys` only, dropping everything else."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        matrix = np.array([self.vectors[k] for k in keys], dtype=np.float32).reshape(len(keys), -1)
+        tmp = self.cache_dir / "embeddings.tmp.npy"
+        np.save(tmp, matrix)
+        os.replace(tmp, self.cache_dir / "embeddings.npy")
+        tmp = self.cache_dir / "embeddings.json.tmp"
+        tmp.write_text(json.dumps({"model": self.model, "keys": keys}), encoding="utf-8")
+        os.replace(tmp, self.cache_dir / "embeddings.json")
+
+
+def _chunk_id(i: int, doc) -> str:
+    """Node id from the source document id and the chunk's position in it."""
+    return f"{doc.node_id}#{i}"
+
+
+_worker_model = None
+
+
+def _init_worker(threads: int) -> None:
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)  # workers share the cores instead of oversubscribing them
+    except Exception:
+        pass
+    _worker_model = _get_embed_model()
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_model.get_text_embedding_batch(texts), dtype=np.float32)
+
+
+def embed_texts(texts: List[str], batch_size: int, workers: int) -> np.ndarray:
+    """Embed `texts` in batches of `batch_size`, spread over `workers` processes."""
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if workers <= 1 or len(batches) <= 1:
+        _init_worker(os.cpu_count() or 1)
+        results = [_embed_batch(b) for b in batches]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+            results = list(pool.map(_embed_batch, batches))
+    return np.concatenate(results) if results else np.zeros((0, 0), dtype=np.float32)
 
 
 def main() -> None:
-    docs_dir = Path("docs")
-    persist_dir = Path("data/index")
+    parser = argparse.ArgumentParser(description="Build (or incrementally update) the docs vector index.")
+    parser.add_argument("--docs", type=str, default="docs")
+    parser.add_argument("--persist_dir", type=str, default="data/index")
+    parser.add_argument("--cache_dir", type=str, default="data/rag_cache", help="content-addressed embedding cache")
+    parser.add_argument("--chunk_size", type=int, default=512, help="tokens per chunk")
+    parser.add_argument("--chunk_overlap", type=int, default=64)
+    parser.add_argument("--batch_size", type=int, default=64, help="chunks per embedding call")
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes (each loads the model once)")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and re-embed every chunk")
+    args = parser.parse_args()
+
+    docs_dir = Path(args.docs)
+    persist_dir = Path(args.persist_dir)
     persist_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
 
-    documents = SimpleDirectoryReader(str(docs_dir)).load_data()
-    embed_model = _get_embed_model()
-    index = VectorStoreIndex.from_documents(documents, embed_model=embed_model)
+    # Document ids are file paths and chunk ids derive from them (the splitter
+    # defaults to random uuids), so an unchanged docs tree gives identical node ids
+    documents = SimpleDirectoryReader(str(docs_dir), recursive=True, filename_as_id=True).load_data()
+    splitter = SentenceSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, id_func=_chunk_id)
+    nodes = splitter.get_nodes_from_documents(documents)
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+    keys = [EmbeddingCache.key(text) for text in texts]
+
+    cache = EmbeddingCache(Path(args.cache_dir), EMBED_MODEL)
+    if args.full:
+        cache.vectors = {}
+    manifest_path = persist_dir / "build_manifest.json"
+    previous = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    if not args.full and previous.get("model") == EMBED_MODEL and previous.get("keys") == keys \
+            and all(k in cache.vectors for k in keys):
+        print(f"Index in {persist_dir} is up to date ({len(keys)} chunks)")
+        return
+
+    cached = sum(k in cache.vectors for k in keys)
+    missing = {k: t for k, t in zip(keys, texts) if k not in cache.vectors}  # identical chunks embedded once
+    if missing:
+        vectors = embed_texts(list(missing.values()), args.batch_size, args.workers)
+        cache.vectors.update(zip(missing.keys(), vectors))
+    cache.save(list(dict.fromkeys(keys)))  # only chunks that still exist are kept
+
+    # Every node carries its embedding, so building the index embeds nothing (the
+    # mock model is never called); deleted or changed documents simply have no
+    # nodes left in it.
+    for node, key in zip(nodes, keys):
+        node.embedding = cache.vectors[key].tolist()
+    dim = len(nodes[0].embedding) if nodes else 1
+    index = VectorStoreIndex(nodes, embed_model=MockEmbedding(embed_dim=dim))
     index.storage_context.persist(persist_dir=str(persist_dir))
-    print(f"Index saved to {persist_dir}")
+
+    removed = len(set(previous.get("keys", [])) - set(keys))
+    manifest_path.write_text(json.dumps({"model": EMBED_MODEL, "keys": keys}), encoding="utf-8")
+    print(f"Index saved to {persist_dir}: {len(documents)} documents, {len(nodes)} chunks "
+          f"({len(nodes) - cached} embedded, {cached} cached, {removed} removed) "
+          f"in {time.perf_counter() - t0:.1f}s")
 
 
 if __name__ == "__main__":
     main()
-
-
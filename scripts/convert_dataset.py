@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+# Ensure project root on sys.path
+import sys
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from rl_project.datasets import columnar_to_jsonl, jsonl_to_columnar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert trajectory datasets between JSONL and the columnar format.")
+    parser.add_argument("--input", type=str, required=True, help="JSONL file or columnar dataset directory")
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--chunk_size", type=int, default=65_536)
+    args = parser.parse_args()
+
+    src = Path(args.input)
+    if src.is_dir():
+        n = columnar_to_jsonl(src, args.output)
+        print(f"Wrote {n} episodes to {args.output}")
+    else:
+        n = jsonl_to_columnar(src, args.output, chunk_size=args.chunk_size)
+        print(f"Wrote {n} transitions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+# Ensure project root on sys.path
+import sys
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from rl_project.hitl.server import FeedbackServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared feedback ingestion service for multiple UI sessions/trainers.")
+    parser.add_argument("--file", type=str, default="data/feedback/gridworld_feedback.json")
+    parser.add_argument("--address", type=str, default="unix:data/feedback/feedback.sock",
+                        help='"unix:/path/to.sock" or "host:port"')
+    parser.add_argument("--max_batch", type=int, default=4096)
+    args = parser.parse_args()
+
+    server = FeedbackServer(Path(args.file), args.address, max_batch=args.max_batch)
+    print(f"Feedback server listening on {args.address}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    print(f"Committed {server.events_committed} events in {server.commits} group commits")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import argparse
 import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Tuple
 
 import numpy as np
 
@@ -15,61 +19,194 @@ if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
 from rl_project.envs import GridWorldEnv
-from rl_project.agents import QLearningAgent
+from rl_project.agents import QLearningAgent, distance_field_expert
+from rl_project.agents.checkpoint import load_checkpoint, save_checkpoint
+from rl_project.datasets import TrajectoryWriter
+from rl_project.profiling import Profiler, maybe_profiler
 
 
-def run_policy(env: GridWorldEnv, policy: str, agent: QLearningAgent | None) -> Dict:
+Transition = Tuple[int, int, float, int, bool]
+
+
+def run_policy(env: GridWorldEnv, policy: str, agent: QLearningAgent | None, profiler: Profiler | None = None) -> Dict:
+    episode = {"transitions": [
+        {"s": s, "a": a, "r": r, "s_next": s_next, "done": done}
+        for s, a, r, s_next, done in rollout(env, policy, agent, profiler)
+    ]}
+    return episode
+
+
+def rollout(env: GridWorldEnv, policy: str, agent: QLearningAgent | None, profiler: Profiler | None = None) -> Iterator[Transition]:
+    """Run one episode with `policy`, yielding `(s, a, r, s_next, done)` per step.
+
+    `done` marks termination at the goal; an episode cut off by the env's step
+    limit simply ends without it, so offline learners still bootstrap there.
+    """
     state, _ = env.reset()
     done = False
-    episode = {"transitions": []}
+    profiling = profiler is not None
+    # shortest-path expert: one BFS per layout (cached), then one table lookup per step
+    expert = distance_field_expert(env.grid).actions if policy == "expert" else None
     while not done:
+        if profiling:
+            t = time.perf_counter_ns()
         if policy == "random":
             action = int(env.action_space.sample())
         elif policy == "expert":
-            # simple greedy heuristic: move closer to goal by Manhattan distance
-            action = greedy_towards_goal(env, state)
+            action = int(expert[state])
         elif policy == "agent":
             assert agent is not None
             action = agent.greedy_action(state)
         else:
             raise ValueError("Unknown policy")
+        if profiling:
+            t = profiler.lap("policy", t)
         next_state, reward, terminated, truncated, _ = env.step(action)
         done = terminated or truncated
-        episode["transitions"].append({
-            "s": int(state), "a": int(action), "r": float(reward), "s_next": int(next_state), "done": bool(done)
-        })
+        if profiling:
+            profiler.lap("env_step", t)
+            profiler.count_steps(1)
+        yield int(state), int(action), float(reward), int(next_state), bool(terminated)
         state = next_state
-    return episode
 
 
-def greedy_towards_goal(env: GridWorldEnv, state: int) -> int:
-    # convert to position
-    y, x = divmod(state, env.grid.width)
-    sx, sy = x, y
-    gx, gy = env.grid.goal
-    # Try to reduce manhattan distance, check obstacle collision by simulating move
-    candidates = []
-    # up
-    candidates.append((0, (sx, max(0, sy - 1))))
-    # down
-    candidates.append((1, (sx, min(env.grid.height - 1, sy + 1))))
-    # left
-    candidates.append((2, (max(0, sx - 1), sy)))
-    # right
-    candidates.append((3, (min(env.grid.width - 1, sx + 1), sy)))
-
-    def manhattan(p):
-        return abs(p[0] - gx) + abs(p[1] - gy)
-
-    # Avoid obstacles by assigning big distance
-    scored = []
-    for a, (nx, ny) in candidates:
-        if (nx, ny) in env.grid.obstacles:
-            scored.append((a, 1e9))
-        else:
-            scored.append((a, manhattan((nx, ny))))
-    scored.sort(key=lambda x: x[1])
-    return int(scored[0][0])
+def pretrain_agent(env: GridWorldEnv, rng: np.random.Generator, episodes: int = 200) -> QLearningAgent:
+    """Quickly pre-train an agent with a small number of episodes."""
+    agent = QLearningAgent(env.observation_space.n, env.action_space.n)
+    for _ in range(episodes):
+        s, _ = env.reset(seed=rng.integers(0, 1_000_000))
+        done = False
+        while not done:
+            a = agent.select_action(s)
+            s2, r, term, trunc, _ = env.step(a)
+            agent.update(s, a, r, s2, term)
+            s = s2
+            done = term or trunc
+    return agent
+
+
+def write_episodes(
+    out: Path,
+    fmt: str,
+    env: GridWorldEnv,
+    policy: str,
+    agent: QLearningAgent | None,
+    episodes: int,
+    profiler: Profiler | None = None,
+) -> int:
+    """Write `episodes` rollouts to `out`; returns the number of transitions.
+
+    With a `profiler`, rollout phases are timed and the time spent encoding and
+    writing records is charged to "write".
+    """
+    count = 0
+    clock = time.perf_counter_ns
+    if fmt == "columnar":
+        with TrajectoryWriter(out) as writer:
+            for _ in range(episodes):
+                for transition in rollout(env, policy, agent, profiler):
+                    if profiler is None:
+                        writer.add(*transition)
+                    else:
+                        t = clock()
+                        writer.add(*transition)
+                        profiler.lap("write", t)
+                writer.end_episode()  # no-op unless the episode was truncated
+            count = writer.num_transitions
+    else:
+        with out.open("w", encoding="utf-8") as f:
+            for _ in range(episodes):
+                ep = run_policy(env, policy, agent, profiler)
+                count += len(ep["transitions"])
+                t = clock()
+                f.write(json.dumps(ep, ensure_ascii=False) + "\n")
+                if profiler is not None:
+                    profiler.lap("write", t)
+    return count
+
+
+def _generate_shard(task: Dict) -> Dict:
+    """Worker: generate one shard with its own seed stream."""
+    random.seed(task["seed"])  # action_space.sample()
+    np.random.seed(task["seed"] % 2**32)
+    env = GridWorldEnv(max_episode_steps=task["max_episode_steps"] or None)
+    agent = None
+    shm = None
+    if task["checkpoint"] is not None:
+        # Every worker maps the same checkpoint file: no copy, no retraining
+        agent = load_checkpoint(task["checkpoint"], mode="r")
+    elif task["shm_name"] is not None:
+        # Attach to the parent's Q-table read-only instead of copying or retraining it
+        shm = shared_memory.SharedMemory(name=task["shm_name"])
+        q_table = np.ndarray(task["q_shape"], dtype=np.float32, buffer=shm.buf)
+        q_table.flags.writeable = False
+        agent = QLearningAgent(task["q_shape"][0], task["q_shape"][1])
+        agent.q_table = q_table
+    profiler = maybe_profiler(task["profile"])
+    try:
+        transitions = write_episodes(Path(task["path"]), task["format"], env, task["policy"], agent, task["episodes"], profiler)
+    finally:
+        if shm is not None:
+            del agent, q_table
+            shm.close()
+    shard = {"path": Path(task["path"]).name, "episodes": task["episodes"], "transitions": transitions, "seed": task["seed"]}
+    if profiler is not None:
+        shard["profile"] = profiler.stop().to_dict()
+    return shard
+
+
+def generate_sharded(args, agent: QLearningAgent | None, profiler: Profiler | None = None) -> Path:
+    """Split `args.episodes` over `args.shards` shards generated by `args.workers` processes.
+
+    Output is a directory with one file (or columnar directory) per shard and a
+    `manifest.json` listing them. Shard seeds are spawned from `args.seed`, so
+    the result does not depend on the number of workers. With a `profiler`,
+    each worker profiles its shard and the phase totals are merged into it.
+    """
+    out = Path(args.output)
+    out.mkdir(parents=True, exist_ok=True)
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(args.seed).spawn(args.shards)]
+    counts = [len(part) for part in np.array_split(np.arange(args.episodes), args.shards)]
+    suffix = "" if args.format == "columnar" else ".jsonl"
+
+    shm = None
+    q_shape = None
+    if agent is not None and not args.checkpoint:
+        q_shape = agent.q_table.shape
+        shm = shared_memory.SharedMemory(create=True, size=agent.q_table.nbytes)
+        np.ndarray(q_shape, dtype=np.float32, buffer=shm.buf)[:] = agent.q_table
+    tasks = [
+        {
+            "path": str(out / f"shard_{i:05d}{suffix}"), "episodes": counts[i], "seed": seeds[i],
+            "format": args.format, "policy": args.policy,
+            "shm_name": shm.name if shm is not None else None, "q_shape": q_shape,
+            "checkpoint": args.checkpoint if agent is not None else None,
+            "profile": profiler is not None,
+            "max_episode_steps": args.max_episode_steps,
+        }
+        for i in range(args.shards)
+    ]
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            shards = list(pool.map(_generate_shard, tasks))
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    if profiler is not None:
+        for shard in shards:
+            profiler.merge(shard.pop("profile"))
+    manifest = {
+        "policy": args.policy,
+        "format": args.format,
+        "seed": args.seed,
+        "episodes": sum(s["episodes"] for s in shards),
+        "transitions": sum(s["transitions"] for s in shards),
+        "shards": shards,
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return out
 
 
 def main():
@@ -78,36 +215,54 @@ def main():
     parser.add_argument("--policy", type=str, default="expert", choices=["random", "expert", "agent"])
     parser.add_argument("--output", type=str, default="data/gridworld_dataset.jsonl")
     parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--format", type=str, default="jsonl", choices=["jsonl", "columnar"],
+                        help="columnar: directory of memory-mappable NumPy columns (see rl_project.datasets)")
+    parser.add_argument("--shards", type=int, default=1, help="split output into N shards plus a manifest (output is a directory)")
+    parser.add_argument("--workers", type=int, default=1, help="processes generating shards in parallel")
+    parser.add_argument("--checkpoint", type=str, default=None, help="for --policy agent: memory-map a saved agent checkpoint")
+    parser.add_argument("--q_table", type=str, default=None, help="for --policy agent: load a saved .npy Q-table instead of pre-training")
+    parser.add_argument("--save_q_table", type=str, default=None, help="for --policy agent: save the pre-trained Q-table (.npy) for reuse")
+    parser.add_argument("--save_checkpoint", type=str, default=None, help="for --policy agent: save the pre-trained agent as a checkpoint")
+    parser.add_argument("--max_episode_steps", type=int, default=500,
+                        help="truncate episodes after this many steps, so a looping policy cannot stall a worker (0: unlimited)")
+    parser.add_argument("--profile", action="store_true", help="print a per-phase timing and allocation breakdown")
     args = parser.parse_args()
+    profiler = maybe_profiler(args.profile)
 
     rng = np.random.default_rng(args.seed)
     np.random.seed(args.seed)
 
-    env = GridWorldEnv()
+    env = GridWorldEnv(max_episode_steps=args.max_episode_steps or None)
     agent = None
     if args.policy == "agent":
-        # Quickly pre-train an agent with a small number of episodes
-        agent = QLearningAgent(env.observation_space.n, env.action_space.n)
-        for _ in range(200):
-            s, _ = env.reset(seed=rng.integers(0, 1_000_000))
-            done = False
-            while not done:
-                a = agent.select_action(s)
-                s2, r, term, trunc, _ = env.step(a)
-                agent.update(s, a, r, s2, term or trunc)
-                s = s2
-                done = term or trunc
+        if args.checkpoint:
+            agent = load_checkpoint(args.checkpoint, mode="r")
+        elif args.q_table:
+            agent = QLearningAgent(env.observation_space.n, env.action_space.n)
+            agent.q_table = np.load(args.q_table, mmap_mode="r")
+        elif profiler is not None:
+            with profiler.phase("pretrain"):
+                agent = pretrain_agent(env, rng)
+        else:
+            agent = pretrain_agent(env, rng)
+        if args.save_q_table:
+            Path(args.save_q_table).parent.mkdir(parents=True, exist_ok=True)
+            np.save(args.save_q_table, agent.q_table)
+        if args.save_checkpoint:
+            save_checkpoint(agent, args.save_checkpoint)
 
-    out = Path(args.output)
-    out.parent.mkdir(parents=True, exist_ok=True)
-    with out.open("w", encoding="utf-8") as f:
-        for _ in range(args.episodes):
-            ep = run_policy(env, args.policy, agent)
-            f.write(json.dumps(ep, ensure_ascii=False) + "\n")
-    print(f"Saved dataset to {out}")
+    if args.shards > 1 or args.workers > 1:
+        args.shards = max(args.shards, args.workers)
+        out = generate_sharded(args, agent, profiler)
+        print(f"Saved {args.shards} shards and manifest to {out}")
+    else:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        write_episodes(out, args.format, env, args.policy, agent, args.episodes, profiler)
+        print(f"Saved dataset to {out}")
+    if profiler is not None:
+        print(profiler.stop().report())
 
 
 if __name__ == "__main__":
     main()
-
-
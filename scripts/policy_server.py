@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+# Ensure project root on sys.path
+import sys
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from rl_project.serving import PolicyServer
+
+
+async def _report(server: PolicyServer, every: float) -> None:
+    while True:
+        await asyncio.sleep(every)
+        s = server.stats.summary()
+        print(f"[v{server.version}] {s['requests_per_s']:.0f} req/s, {s['states_per_s']:.0f} states/s, "
+              f"p50 {s['p50_ms']:.3f} ms, p99 {s['p99_ms']:.3f} ms, mean batch {s['mean_batch_requests']:.1f}")
+        server.stats.reset()
+
+
+async def _run(server: PolicyServer, stats_every: float) -> None:
+    reporter = asyncio.create_task(_report(server, stats_every)) if stats_every > 0 else None
+    try:
+        await server.serve_forever()
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched greedy-policy inference service over a Q-table checkpoint.")
+    parser.add_argument("--checkpoint", type=str, default="data/checkpoints/gridworld_agent.qckpt")
+    parser.add_argument("--address", type=str, default="unix:data/checkpoints/policy.sock",
+                        help='"unix:/path/to.sock" or "host:port"')
+    parser.add_argument("--max_batch", type=int, default=8192)
+    parser.add_argument("--max_delay_ms", type=float, default=0.0, help="wait this long for a micro-batch to fill")
+    parser.add_argument("--watch", type=float, default=1.0, help="seconds between checkpoint change checks (0: off)")
+    parser.add_argument("--stats_every", type=float, default=10.0, help="seconds between stats lines (0: off)")
+    args = parser.parse_args()
+
+    server = PolicyServer(args.checkpoint, args.address, args.max_batch, args.max_delay_ms, args.watch)
+    print(f"Serving {args.checkpoint} on {args.address}")
+    try:
+        asyncio.run(_run(server, args.stats_every))
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
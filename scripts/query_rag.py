@@ -1,39 +1,140 @@
 from __future__ import annotations
 
+import argparse
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import sys
+root = str(Path(__file__).resolve().parents[1])
+if root not in sys.path:
+    sys.path.insert(0, root)
+
 try:
-    from llama_index.core import StorageContext, load_index_from_storage
     from llama_index.core.embeddings import resolve_embed_model
     def _get_embed_model():
         return resolve_embed_model("local:sentence-transformers/all-MiniLM-L6-v2")
 except Exception:
-    from llama_index import StorageContext, load_index_from_storage  # type: ignore
     from llama_index.embeddings.huggingface import HuggingFaceEmbedding  # type: ignore
     def _get_embed_model():
         return HuggingFaceEmbedding("sentence-transformers/all-MiniLM-L6-v2")
 
-from pathlib import Path
-import sys
 
-root = str(Path(__file__).resolve().parents[1])
-if root not in sys.path:
-    sys.path.insert(0, root)
+class VectorIndex:
+    """Exact cosine top-k over a persisted LlamaIndex store, as one float32 matrix.
 
+    The first load converts `default__vector_store.json` into unit-normalized
+    rows in `<cache_dir>/vectors.npy` (plus `vectors.json` with the node ids),
+    stamped with the JSON file's path, mtime and size; later loads memory-map
+    the matrix directly and only reconvert after the index is rebuilt. The
+    cache stays out of the (tracked) index directory. A query is one
+    matrix-vector product and a partial sort.
+    """
+    def __init__(self, persist_dir, cache_dir="data/rag_cache") -> None:
+        self.persist_dir = Path(persist_dir)
+        self.cache_dir = Path(cache_dir)
+        self.ids, self.matrix = self._load_matrix()
+        docstore = json.loads((self.persist_dir / "docstore.json").read_text(encoding="utf-8"))
+        nodes = docstore.get("docstore/data", {})
+        self.texts = [nodes.get(i, {}).get("__data__", {}).get("text", "") for i in self.ids]
+        self.sources = [nodes.get(i, {}).get("__data__", {}).get("metadata", {}).get("file_name", "") for i in self.ids]
 
-def main(query: str) -> None:
-    storage_context = StorageContext.from_defaults(persist_dir="data/index")
-    index = load_index_from_storage(storage_context, embed_model=_get_embed_model())
-    # Disable default LLM to avoid OpenAI API key requirement
-    try:
-        from llama_index.core import Settings  # type: ignore
-        Settings.llm = None
-    except Exception:
-        pass
-    query_engine = index.as_query_engine(similarity_top_k=5)
-    print(query_engine.query(query))
+    def _load_matrix(self):
+        store = self.persist_dir / "default__vector_store.json"
+        meta_path, npy_path = self.cache_dir / "vectors.json", self.cache_dir / "vectors.npy"
+        st = os.stat(store)
+        stamp = [str(store.resolve()), st.st_mtime_ns, st.st_size]
+        if meta_path.exists() and npy_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("source") == stamp:
+                return meta["ids"], np.load(npy_path, mmap_mode="r")
 
+        embeddings: Dict[str, List[float]] = json.loads(store.read_text(encoding="utf-8"))["embedding_dict"]
+        ids = list(embeddings)
+        matrix = np.array([embeddings[i] for i in ids], dtype=np.float32).reshape(len(ids), -1)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / "vectors.tmp.npy"
+        np.save(tmp, np.ascontiguousarray(matrix))
+        os.replace(tmp, npy_path)
+        tmp = self.cache_dir / "vectors.json.tmp"
+        tmp.write_text(json.dumps({"source": stamp, "ids": ids}), encoding="utf-8")
+        os.replace(tmp, meta_path)
+        return ids, np.load(npy_path, mmap_mode="r")
+
+    def search(self, query: np.ndarray, k: int) -> List[Dict]:
+        """The `k` chunks most similar to the unit vector `query`, best first."""
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        scores = self.matrix @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{"id": self.ids[i], "score": float(scores[i]), "file": self.sources[i], "text": self.texts[i]} for i in top]
+
+
+class QueryEngine:
+    """Index and embedding model loaded once; query embeddings cached in an LRU."""
+    def __init__(self, persist_dir="data/index", top_k: int = 5, cache_size: int = 1024,
+                 cache_dir="data/rag_cache") -> None:
+        self.index = VectorIndex(persist_dir, cache_dir)
+        self.model = _get_embed_model()
+        self.top_k = top_k
+        self.embed = lru_cache(maxsize=cache_size)(self._embed)
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.asarray(self.model.get_query_embedding(text), dtype=np.float32)
+        vec /= max(float(np.linalg.norm(vec)), 1e-12)
+        vec.flags.writeable = False  # shared by every cache hit
+        return vec
+
+    def query(self, text: str, k: Optional[int] = None) -> List[Dict]:
+        return self.index.search(self.embed(text.strip()), k or self.top_k)
 
-if __name__ == "__main__":
-    q = sys.argv[1] if len(sys.argv) > 1 else "如何在本项目里开启人类反馈并可视化训练曲线？"
-    main(q)
 
+def print_results(query: str, results: List[Dict], elapsed_ms: float, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps({"query": query, "results": results, "ms": elapsed_ms}, ensure_ascii=False), flush=True)
+        return
+    print(f"Q: {query}  ({elapsed_ms:.1f} ms)")
+    for rank, r in enumerate(results, 1):
+        snippet = " ".join(r["text"].split())[:200]
+        print(f"  {rank}. [{r['score']:.3f}] {r['file']}: {snippet}")
+    sys.stdout.flush()
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query the docs index; --stdin keeps the index and model loaded.")
+    parser.add_argument("query", nargs="?", default="如何在本项目里开启人类反馈并可视化训练曲线？")
+    parser.add_argument("--persist_dir", type=str, default="data/index")
+    parser.add_argument("--cache_dir", type=str, default="data/rag_cache", help="where the normalized vector matrix is cached")
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--stdin", action="store_true", help="answer one query per input line until EOF (REPL / batch mode)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per query")
+    parser.add_argument("--cache_size", type=int, default=1024, help="query embeddings kept in the LRU cache")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    engine = QueryEngine(args.persist_dir, args.top_k, args.cache_size, args.cache_dir)
+    print(f"Loaded {len(engine.index.ids)} chunks and the embedding model in {time.perf_counter() - t0:.2f}s",
+          file=sys.stderr)
+
+    queries = (line.strip() for line in sys.stdin) if args.stdin else iter([args.query])
+    for q in queries:
+        if not q:
+            continue
+        t = time.perf_counter()
+        results = engine.query(q)
+        print_results(q, results, (time.perf_counter() - t) * 1e3, args.json)
+    if args.stdin:
+        info = engine.embed.cache_info()
+        print(f"Query embedding cache: {info.hits} hits, {info.misses} misses", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
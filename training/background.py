@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from rl_project.agents import QLearningAgent
+from rl_project.envs import GridWorldEnv
+from rl_project.hitl.feedback_manager import FeedbackManager
+from rl_project.profiling import Profiler, maybe_profiler
+from training.train_q_learning import run_episode
+
+
+class BackgroundTrainer:
+    """Runs learning episodes on a worker thread and publishes progress.
+
+    The worker steps its own `GridWorldEnv` on the agent's grid, so an
+    interactive session using another env is not disturbed; the agent itself is
+    shared and each episode holds `lock` (take it too when updating the agent
+    from elsewhere). Progress is published for polling readers:
+
+      - returns go into a fixed-size ring buffer with a running episode count,
+        so `returns_since(cursor)` hands a reader only what it has not seen;
+      - every `snapshot_every` seconds a copy of the Q-table is taken and
+        `snapshot_version` bumped, so readers redraw the policy only on change.
+
+    Pause, resume and cancel take effect between episodes.
+
+    Args:
+      env: Environment whose grid (and reward settings) the worker copies.
+      agent: Agent to train.
+      feedback_mgr: Optional feedback for reward shaping (see `start`).
+      capacity: Returns kept in the ring buffer.
+      snapshot_every: Seconds between Q-table snapshots.
+    """
+    def __init__(
+        self,
+        env: GridWorldEnv,
+        agent: QLearningAgent,
+        feedback_mgr: Optional[FeedbackManager] = None,
+        capacity: int = 10_000,
+        snapshot_every: float = 0.5,
+    ) -> None:
+        self.env = GridWorldEnv(grid=env.grid, step_penalty=env.step_penalty, obstacle_penalty=env.obstacle_penalty,
+                                goal_reward=env.goal_reward, max_episode_steps=env.max_episode_steps)
+        self.agent = agent
+        self.feedback_mgr = feedback_mgr
+        self.snapshot_every = snapshot_every
+        self.capacity = int(capacity)
+        self.lock = threading.RLock()
+        self._returns = np.zeros(self.capacity, dtype=np.float64)
+        self._count = 0  # episodes finished since construction (monotonic)
+        self._target = 0  # value of `_count` at which the current run ends
+        self._state = "idle"  # idle | running | paused | finished | cancelled | failed
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot: Optional[np.ndarray] = None
+        self.snapshot_version = 0
+        self.profiler: Optional[Profiler] = None
+        self.error: Optional[BaseException] = None
+        self._started_at = 0.0
+        self._finished_at: Optional[float] = None
+        self._run_start_count = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, episodes: int, use_feedback: bool = False, profile: bool = False) -> bool:
+        """Train `episodes` more episodes in the background; False if already running."""
+        if self.running:
+            return False
+        self._cancel.clear()
+        self._resume.set()
+        self.error = None
+        self._run_start_count = self._count
+        self._target = self._count + int(episodes)
+        self.profiler = maybe_profiler(profile)
+        self._started_at = time.perf_counter()
+        self._finished_at = None
+        self._state = "running"
+        self._thread = threading.Thread(target=self._run, args=(use_feedback,), name="background-trainer", daemon=True)
+        self._thread.start()
+        return True
+
+    def pause(self) -> None:
+        if self.running and self._state == "running":
+            self._resume.clear()
+            self._state = "paused"
+
+    def resume(self) -> None:
+        if self.running and self._state == "paused":
+            self._state = "running"
+            self._resume.set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        self._resume.set()  # wake a paused worker so it can exit
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, use_feedback: bool) -> None:
+        last_snapshot = 0.0
+        try:
+            while self._count < self._target:
+                self._resume.wait()
+                if self._cancel.is_set():
+                    break
+                with self.lock:
+                    s, _ = self.env.reset()
+                    # the shaping matrix is re-read every episode, so new feedback applies as it arrives
+                    ep_return = run_episode(self.env, self.agent, s,
+                                            self.feedback_mgr if use_feedback else None, profiler=self.profiler)
+                self._returns[self._count % self._returns.size] = ep_return
+                self._count += 1  # publish after the slot is written
+                now = time.perf_counter()
+                if now - last_snapshot >= self.snapshot_every:
+                    self._take_snapshot()
+                    last_snapshot = now
+        except BaseException as e:  # surfaced to the page through `progress()`
+            self.error = e
+        finally:
+            self._take_snapshot()
+            if self.profiler is not None:
+                self.profiler.stop()
+            self._finished_at = time.perf_counter()
+            self._state = "cancelled" if self._cancel.is_set() else ("failed" if self.error else "finished")
+
+    def _take_snapshot(self) -> None:
+        with self.lock:
+            self._snapshot = np.array(self.agent.q_table, dtype=np.float32, copy=True)
+        self.snapshot_version += 1
+
+    def returns_since(self, cursor: int) -> Tuple[np.ndarray, int]:
+        """Returns of episodes `cursor..` not yet seen, and the new cursor.
+
+        Episodes that already fell out of the ring buffer are skipped.
+        """
+        count = self._count
+        start = max(cursor, count - self._returns.size)
+        idx = np.arange(start, count) % self._returns.size
+        return self._returns[idx].copy(), count
+
+    def recent_returns(self, n: Optional[int] = None) -> np.ndarray:
+        """The last `n` returns still in the buffer (oldest first)."""
+        count = self._count
+        n = min(count, self._returns.size) if n is None else min(n, count, self._returns.size)
+        return self._returns[np.arange(count - n, count) % self._returns.size].copy()
+
+    def snapshot(self) -> Tuple[int, Optional[np.ndarray]]:
+        """Latest Q-table copy and its version (0 before the first snapshot)."""
+        return self.snapshot_version, self._snapshot
+
+    def progress(self) -> Dict:
+        done = self._count - self._run_start_count
+        total = self._target - self._run_start_count
+        end = self._finished_at if self._finished_at is not None else time.perf_counter()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        return {
+            "state": self._state,
+            "episodes_done": done,
+            "episodes_total": total,
+            "fraction": done / total if total else 0.0,
+            "episodes_total_all_runs": self._count,
+            "elapsed_s": elapsed,
+            "episodes_per_s": done / elapsed if elapsed > 0 else 0.0,
+            "error": repr(self.error) if self.error else None,
+        }
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Ensure project root on sys.path for direct script execution
+import sys
+from pathlib import Path as _Path
+_project_root = str(_Path(__file__).resolve().parents[1])
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from rl_project.envs import GridWorldEnv
+from rl_project.agents import QLearningAgent, QLearningConfig
+from rl_project.hitl.feedback_manager import FeedbackManager, FeedbackConfig
+from training.train_q_learning import DEFAULT_MAX_EPISODE_STEPS, run_episode
+
+
+CONFIG_PARAMS = {f.name for f in fields(QLearningConfig)} - {"batch_duplicates", "q_backend"}
+SWEEP_PARAMS = CONFIG_PARAMS | {"beta"}
+FEEDBACK_FILE = Path("data/feedback/gridworld_feedback.json")
+
+
+@dataclass
+class Trial:
+    """One hyperparameter combination and its resumable training state."""
+    trial_id: int
+    params: Dict[str, float]
+    seed: int
+    returns: List[float] = field(default_factory=list)
+    q_table: Optional[np.ndarray] = None
+    steps_done: int = 0
+    rng_state: Optional[Dict[str, Any]] = None
+    np_random_state: Optional[tuple] = None
+    wall_time: float = 0.0
+    status: str = "running"
+
+    def score(self, window: int) -> float:
+        return float(np.mean(self.returns[-window:])) if self.returns else -math.inf
+
+
+def grid_space(spec: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """Cartesian product of the listed values for each parameter."""
+    names = sorted(spec)
+    return [dict(zip(names, values)) for values in itertools.product(*(spec[n] for n in names))]
+
+
+def random_space(spec: Dict[str, tuple], num_trials: int, seed: int) -> List[Dict[str, float]]:
+    """Sample `num_trials` points; each spec entry is `(kind, low, high)` with kind
+    `uniform`, `loguniform` or `int`."""
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(num_trials):
+        params: Dict[str, float] = {}
+        for name, (kind, low, high) in sorted(spec.items()):
+            if kind == "uniform":
+                params[name] = float(rng.uniform(low, high))
+            elif kind == "loguniform":
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            elif kind == "int":
+                params[name] = int(rng.integers(int(low), int(high) + 1))
+            else:
+                raise ValueError(f"Unknown distribution '{kind}' for {name}")
+        trials.append(params)
+    return trials
+
+
+def rung_budgets(min_episodes: int, max_episodes: int, eta: int) -> List[int]:
+    """Cumulative episode budgets of the successive-halving rungs."""
+    budgets = [min_episodes]
+    while budgets[-1] * eta < max_episodes:
+        budgets.append(budgets[-1] * eta)
+    if budgets[-1] < max_episodes:
+        budgets.append(max_episodes)
+    return budgets
+
+
+def _advance_trial(trial: Trial, target_episodes: int, use_feedback: bool) -> Trial:
+    """Resume `trial` and train it until it has run `target_episodes` episodes."""
+    t0 = time.perf_counter()
+    config = QLearningConfig(**{k: v for k, v in trial.params.items() if k in CONFIG_PARAMS})
+    env = GridWorldEnv(max_episode_steps=DEFAULT_MAX_EPISODE_STEPS)
+    agent = QLearningAgent(env.observation_space.n, env.action_space.n, config)
+    rng = np.random.default_rng(trial.seed)
+    np.random.seed(trial.seed)
+    if trial.q_table is not None:
+        agent.q_table = trial.q_table.copy()
+        agent._steps_done = trial.steps_done
+        rng.bit_generator.state = trial.rng_state
+        np.random.set_state(trial.np_random_state)
+
+    feedback_mgr = None
+    if use_feedback:
+        beta = float(trial.params.get("beta", FeedbackConfig.beta))
+        feedback_mgr = FeedbackManager(FeedbackConfig(file_path=FEEDBACK_FILE, beta=beta))
+
+    for _ in range(target_episodes - len(trial.returns)):
+        state, _ = env.reset(seed=rng.integers(0, 1_000_000))
+        trial.returns.append(run_episode(env, agent, state, feedback_mgr))
+
+    trial.q_table = agent.q_table
+    trial.steps_done = agent._steps_done
+    trial.rng_state = rng.bit_generator.state
+    trial.np_random_state = np.random.get_state()
+    trial.wall_time += time.perf_counter() - t0
+    return trial
+
+
+def run_sweep(
+    space: List[Dict[str, float]],
+    min_episodes: int,
+    max_episodes: int,
+    eta: int = 3,
+    window: int = 50,
+    workers: int = 1,
+    use_feedback: bool = False,
+    seed: int = 42,
+) -> List[Trial]:
+    """Successive-halving sweep over `space`.
+
+    All trials train to the first rung's budget; after each rung only the best
+    `1/eta` (by mean return over the last `window` episodes) resume towards the
+    next budget, until the survivors reach `max_episodes`. Trials run in a
+    process pool of `workers` processes.
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(len(space))
+    trials = [Trial(i, params, int(s)) for i, (params, s) in enumerate(zip(space, seeds))]
+    alive = list(trials)
+    budgets = rung_budgets(min_episodes, max_episodes, eta)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rung, budget in enumerate(budgets):
+            alive = list(pool.map(_advance_trial, alive, [budget] * len(alive), [use_feedback] * len(alive)))
+            for t in alive:
+                trials[t.trial_id] = t
+            if rung == len(budgets) - 1:
+                break
+            alive.sort(key=lambda t: t.score(window), reverse=True)
+            keep = max(1, len(alive) // eta)
+            for t in alive[keep:]:
+                trials[t.trial_id].status = f"pruned@{budget}"
+            alive = alive[:keep]
+            print(f"rung {rung}: {budget} episodes, kept {keep} trial(s), best {alive[0].score(window):.2f}")
+
+    for t in alive:
+        t.status = "completed"
+    return trials
+
+
+def write_results(trials: List[Trial], path: Path, window: int) -> None:
+    param_names = sorted({k for t in trials for k in t.params})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trial", *param_names, "episodes", f"mean_return_last{window}", "status", "wall_time_s"])
+        for t in sorted(trials, key=lambda t: t.score(window), reverse=True):
+            writer.writerow([
+                t.trial_id, *(t.params.get(n, "") for n in param_names), len(t.returns),
+                f"{t.score(window):.4f}", t.status, f"{t.wall_time:.3f}",
+            ])
+
+
+def _parse_space(items: List[str], kind: str) -> Dict[str, Any]:
+    spec: Dict[str, Any] = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if name not in SWEEP_PARAMS:
+            raise ValueError(f"Unknown sweep parameter '{name}', expected one of {sorted(SWEEP_PARAMS)}")
+        if kind == "grid":
+            spec[name] = [float(v) if name != "epsilon_decay_steps" else int(float(v)) for v in values.split(",")]
+        else:
+            dist, low, high = values.split(":")
+            spec[name] = (dist, float(low), float(high))
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter sweep for Q-learning.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="grid values for a parameter (repeatable)")
+    parser.add_argument("--random", action="append", default=[], metavar="NAME=DIST:LOW:HIGH",
+                        help="random-search distribution (uniform/loguniform/int) for a parameter (repeatable)")
+    parser.add_argument("--trials", type=int, default=27, help="number of random-search trials")
+    parser.add_argument("--min_episodes", type=int, default=50)
+    parser.add_argument("--max_episodes", type=int, default=1000)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--use_feedback", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="data/sweeps/sweep_results.csv")
+    args = parser.parse_args()
+
+    if bool(args.grid) == bool(args.random):
+        parser.error("give either --grid or --random parameters")
+    if args.grid:
+        space = grid_space(_parse_space(args.grid, "grid"))
+    else:
+        space = random_space(_parse_space(args.random, "random"), args.trials, args.seed)
+    if any("beta" in p for p in space) and not args.use_feedback:
+        parser.error("sweeping beta requires --use_feedback 1")
+
+    t0 = time.perf_counter()
+    trials = run_sweep(space, args.min_episodes, args.max_episodes, args.eta, args.window,
+                       args.workers, bool(args.use_feedback), args.seed)
+    elapsed = time.perf_counter() - t0
+    write_results(trials, Path(args.output), args.window)
+
+    trained = sum(len(t.returns) for t in trials)
+    best = max(trials, key=lambda t: t.score(args.window) if t.status == "completed" else -math.inf)
+    print(f"Sweep finished in {elapsed:.1f}s: {trained} episodes trained "
+          f"({trained / (len(trials) * args.max_episodes):.0%} of running every trial to completion)")
+    print(f"Best trial {best.trial_id}: {best.params} -> {best.score(args.window):.2f}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Optional
+
+import numpy as np
+
+# Ensure project root on sys.path for direct script execution
+import sys
+from pathlib import Path as _Path
+_project_root = str(_Path(__file__).resolve().parents[1])
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from rl_project.envs import GridWorldEnv
+from rl_project.agents import QLearningAgent, QLearningConfig, value_iteration
+from rl_project.agents.offline import OfflineConfig, fit_offline
+from rl_project.datasets import open_trajectories
+
+
+def greedy_return(env: GridWorldEnv, q_table: np.ndarray, max_steps: Optional[int] = None) -> float:
+    """Return of the greedy policy from the start state, capped at `max_steps`."""
+    max_steps = max_steps or 4 * env.observation_space.n
+    state, _ = env.reset()
+    total = 0.0
+    for _ in range(max_steps):
+        state, reward, terminated, truncated, _ = env.step(int(np.argmax(q_table[state])))
+        total += reward
+        if terminated or truncated:
+            break
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline (batch) Q-learning from recorded trajectory datasets.")
+    parser.add_argument("--dataset", type=str, required=True, help="JSONL file, columnar directory or sharded directory")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch_size", type=int, default=4096)
+    parser.add_argument("--replay_ratio", type=int, default=1)
+    parser.add_argument("--learning_rate", type=float, default=0.5)
+    parser.add_argument("--duplicates", type=str, default="average", choices=["sequential", "average"])
+    parser.add_argument("--target_return", type=float, default=None,
+                        help="stop once the greedy return reaches this (default: the optimal return)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = GridWorldEnv()
+    config = QLearningConfig(learning_rate=args.learning_rate, batch_duplicates=args.duplicates)
+    agent = QLearningAgent(env.observation_space.n, env.action_space.n, config)
+    target = args.target_return
+    if target is None:
+        target = greedy_return(env, value_iteration(env.model, gamma=config.discount_gamma))
+
+    def reached_target(epoch: int, agent: QLearningAgent) -> bool:
+        ret = greedy_return(env, agent.q_table)
+        print(f"epoch {epoch + 1}: greedy return {ret:.2f}")
+        return ret >= target
+
+    t0 = time.perf_counter()
+    datasets = open_trajectories(args.dataset)
+    try:
+        report = fit_offline(
+            agent, datasets,
+            OfflineConfig(epochs=args.epochs, batch_size=args.batch_size, replay_ratio=args.replay_ratio, seed=args.seed),
+            on_epoch=reached_target,
+        )
+    finally:
+        for reader in datasets:
+            reader.close()
+    elapsed = time.perf_counter() - t0
+
+    cov = report.coverage
+    print(f"Dataset: {int(cov['transitions'])} transitions, "
+          f"(state, action) coverage {cov['state_action_coverage']:.1%} "
+          f"({int(cov['pairs_seen'])}/{int(cov['pairs_total'])}), state coverage {cov['state_coverage']:.1%}")
+    print(f"Offline training finished in {elapsed:.2f}s: {report.epochs} epochs, {report.updates} updates, "
+          f"greedy return {greedy_return(env, agent.q_table):.2f} (target {target:.2f})")
+
+
+if __name__ == "__main__":
+    main()
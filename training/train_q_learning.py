@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import argparse
+import json
+import multiprocessing as mp
+import queue as queue_mod
+import time
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import numpy as np
 
@@ -13,17 +18,49 @@ _project_root = str(_Path(__file__).resolve().parents[1])
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from rl_project.envs import GridWorldEnv
-from rl_project.agents import QLearningAgent, QLearningConfig
+from rl_project.envs import GridWorldEnv, VectorGridWorldEnv
+from rl_project.agents import EvaluationReport, QLearningAgent, QLearningConfig, evaluate_policy
+from rl_project.agents.checkpoint import load_checkpoint, save_checkpoint
 from rl_project.hitl.feedback_manager import FeedbackManager, FeedbackConfig
+from rl_project.profiling import Profiler, maybe_profiler
 
 
-def run_training(episodes: int, use_feedback: bool, render: bool, seed: int) -> Tuple[QLearningAgent, List[float]]:
-    env = GridWorldEnv()
+# Bound on episode length, so a looping policy cannot stall a training job (0 / None: unlimited)
+DEFAULT_MAX_EPISODE_STEPS = 500
+
+
+def run_training(
+    episodes: int,
+    use_feedback: bool,
+    render: bool,
+    seed: int,
+    q_backend: str = "dense",
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 0,
+    resume_from: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    eval_every: int = 0,
+    on_eval: Optional[Callable[[int, EvaluationReport], None]] = None,
+    max_episode_steps: Optional[int] = DEFAULT_MAX_EPISODE_STEPS,
+) -> Tuple[QLearningAgent, List[float]]:
+    """Single-env training loop.
+
+    With `checkpoint_path`, the agent is checkpointed atomically every
+    `checkpoint_every` episodes (if > 0) and at the end; `resume_from` warm
+    starts from an existing checkpoint (mapped copy-on-write). A `profiler`
+    receives per-phase timings (see `run_episode`). With `eval_every > 0` the
+    greedy policy is evaluated from every start state (`evaluate_policy`) every
+    `eval_every` episodes and the report passed to `on_eval(episodes_done, report)`.
+    Episodes are truncated after `max_episode_steps` steps.
+    """
+    env = GridWorldEnv(max_episode_steps=max_episode_steps or None)
     rng = np.random.default_rng(seed)
     np.random.seed(seed)
 
-    agent = QLearningAgent(env.observation_space.n, env.action_space.n, QLearningConfig())
+    if resume_from:
+        agent = load_checkpoint(resume_from, mode="c")
+    else:
+        agent = QLearningAgent(env.observation_space.n, env.action_space.n, QLearningConfig(q_backend=q_backend))
 
     feedback_mgr = None
     if use_feedback:
@@ -32,35 +69,355 @@ def run_training(episodes: int, use_feedback: bool, render: bool, seed: int) ->
 
     episode_returns: List[float] = []
     for ep in range(episodes):
+        t = time.perf_counter_ns()
         state, _ = env.reset(seed=rng.integers(0, 1_000_000))
-        ep_return = 0.0
-        done = False
-        while not done:
-            action = agent.select_action(state)
-            next_state, reward, terminated, truncated, _ = env.step(action)
-            done = terminated or truncated
-            if use_feedback and feedback_mgr is not None:
-                reward = feedback_mgr.shaped_reward(reward, state, action)
-            agent.update(state, action, reward, next_state, done)
-            state = next_state
-            ep_return += reward
-            if render and ep % 50 == 0:
-                print(env.render())
-                print("----")
-        episode_returns.append(ep_return)
+        if profiler is not None:
+            profiler.lap("reset", t)
+        episode_returns.append(run_episode(env, agent, state, feedback_mgr, render and ep % 50 == 0, profiler))
+        if checkpoint_path and checkpoint_every > 0 and (ep + 1) % checkpoint_every == 0:
+            t = time.perf_counter_ns()
+            save_checkpoint(agent, checkpoint_path)
+            if profiler is not None:
+                profiler.lap("checkpoint", t)
+        if eval_every > 0 and (ep + 1) % eval_every == 0:
+            t = time.perf_counter_ns()
+            report = evaluate_policy(env, agent)
+            if profiler is not None:
+                profiler.lap("evaluate", t)
+            if on_eval is not None:
+                on_eval(ep + 1, report)
+    if checkpoint_path:
+        save_checkpoint(agent, checkpoint_path)
     return agent, episode_returns
 
 
+def run_episode(
+    env: GridWorldEnv,
+    agent: QLearningAgent,
+    state: int,
+    feedback_mgr: Optional[FeedbackManager] = None,
+    render: bool = False,
+    profiler: Optional[Profiler] = None,
+) -> float:
+    """Run one learning episode starting from `state`, just returned by `env.reset`.
+
+    With a `profiler`, an instrumented copy of the loop times each phase;
+    without one, the loop below runs with no instrumentation at all.
+    """
+    shaping = feedback_mgr.shaping_matrix(agent.num_states, agent.num_actions) if feedback_mgr is not None else None
+    if profiler is not None:
+        return _run_episode_profiled(env, agent, state, shaping, render, profiler)
+    ep_return = 0.0
+    done = False
+    while not done:
+        action = agent.select_action(state)
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        done = terminated or truncated
+        if shaping is not None:
+            reward += shaping.item(state, action)
+        agent.update(state, action, reward, next_state, terminated)  # truncation still bootstraps
+        state = next_state
+        ep_return += reward
+        if render:
+            print(env.render())
+            print("----")
+    return ep_return
+
+
+def _run_episode_profiled(
+    env: GridWorldEnv,
+    agent: QLearningAgent,
+    state: int,
+    shaping: Optional[np.ndarray],
+    render: bool,
+    profiler: Profiler,
+) -> float:
+    """`run_episode` with `perf_counter_ns` laps around every phase."""
+    lap = profiler.lap
+    clock = time.perf_counter_ns
+    ep_return = 0.0
+    done = False
+    while not done:
+        t = clock()
+        action = agent.select_action(state)
+        t = lap("select_action", t)
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        t = lap("env_step", t)
+        done = terminated or truncated
+        if shaping is not None:
+            reward += shaping.item(state, action)
+            t = lap("shaping", t)
+        agent.update(state, action, reward, next_state, terminated)
+        t = lap("td_update", t)
+        state = next_state
+        ep_return += reward
+        if render:
+            print(env.render())
+            print("----")
+            lap("render", t)
+        profiler.count_steps(1)
+    return ep_return
+
+
+def run_vector_training(
+    episodes: int,
+    use_feedback: bool,
+    seed: int,
+    num_envs: int,
+    q_backend: str = "dense",
+    profiler: Optional[Profiler] = None,
+    eval_every: int = 0,
+    on_eval: Optional[Callable[[int, EvaluationReport], None]] = None,
+    max_episode_steps: Optional[int] = DEFAULT_MAX_EPISODE_STEPS,
+) -> Tuple[QLearningAgent, List[float]]:
+    """Same learner as `run_training`, fed by `num_envs` batched environments.
+
+    Returns are recorded in the order episodes finish, until `episodes` of them
+    have completed. Evaluation (see `run_training`) runs after the batched step
+    in which the completed-episode count crosses a multiple of `eval_every`.
+    """
+    env = VectorGridWorldEnv(num_envs, max_episode_steps=max_episode_steps or None)
+    rng = np.random.default_rng(seed)
+    np.random.seed(seed)
+
+    agent = QLearningAgent(env.observation_space.n, env.action_space.n, QLearningConfig(q_backend=q_backend))
+
+    feedback_mgr = None
+    if use_feedback:
+        feedback_file = Path("data/feedback/gridworld_feedback.json")
+        feedback_mgr = FeedbackManager(FeedbackConfig(file_path=feedback_file))
+        feedback_mgr.shaping_matrix(agent.num_states, agent.num_actions)
+
+    episode_returns: List[float] = []
+    states, _ = env.reset(seed=rng.integers(0, 1_000_000))
+    ep_returns = np.zeros(num_envs, dtype=np.float64)
+    # One profiler check per batched step is negligible next to the batch itself
+    while len(episode_returns) < episodes:
+        t = time.perf_counter_ns()
+        actions = agent.select_actions(states)
+        if profiler is not None:
+            t = profiler.lap("select_action", t)
+        next_states, rewards, terminated, truncated, info = env.step(actions)
+        if profiler is not None:
+            t = profiler.lap("env_step", t)
+        dones = terminated | truncated
+        # auto-reset replaced finished observations; learn from the real ones
+        final_states = info["final_observation"] if "final_observation" in info else next_states
+        if use_feedback and feedback_mgr is not None:
+            rewards = feedback_mgr.shaped_rewards(rewards, states, actions)
+            if profiler is not None:
+                t = profiler.lap("shaping", t)
+        agent.update_batch(states, actions, rewards, final_states, terminated)
+        if profiler is not None:
+            profiler.lap("td_update", t)
+            profiler.count_steps(num_envs)
+        ep_returns += rewards
+        finished_before = len(episode_returns)
+        for i in np.flatnonzero(dones):
+            episode_returns.append(float(ep_returns[i]))
+            ep_returns[i] = 0.0
+        states = next_states
+        if eval_every > 0 and len(episode_returns) // eval_every > finished_before // eval_every:
+            t = time.perf_counter_ns()
+            report = evaluate_policy(env, agent)
+            if profiler is not None:
+                profiler.lap("evaluate", t)
+            if on_eval is not None:
+                on_eval(min(len(episode_returns), episodes), report)
+    return agent, episode_returns[:episodes]
+
+
+def run_parallel_training(
+    episodes: int,
+    use_feedback: bool,
+    seed: int,
+    workers: int,
+    sync_every: int = 0,
+    on_return: Optional[Callable[[int, int, float], None]] = None,
+    max_episode_steps: Optional[int] = DEFAULT_MAX_EPISODE_STEPS,
+) -> Tuple[List[QLearningAgent], List[List[float]]]:
+    """Train `workers` learners in parallel worker processes.
+
+    Each worker runs `episodes` episodes with its own seed drawn from `seed`.
+    All Q-tables live in one shared-memory block, so nothing is pickled between
+    processes. With `sync_every > 0` the workers meet every `sync_every`
+    episodes and replace their tables by the average of all of them, so they
+    jointly learn a single policy; with `0` they stay fully independent.
+
+    Episode returns are streamed to the parent as they are produced and passed
+    to `on_return(worker_id, episode, ep_return)` if given.
+
+    Returns:
+      One agent per worker (holding a private copy of its final table) and the
+      per-worker lists of episode returns.
+    """
+    env = GridWorldEnv()
+    shape = (workers + 1, env.observation_space.n, env.action_space.n)  # last slot: sync scratch
+    nbytes = int(np.prod(shape)) * np.dtype(np.float32).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    ctx = mp.get_context()
+    returns_queue = ctx.Queue()
+    barrier = ctx.Barrier(workers) if sync_every > 0 else None
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(workers)]
+
+    returns: List[List[float]] = [[] for _ in range(workers)]
+    steps_done = [0] * workers
+    procs = [
+        ctx.Process(
+            target=_parallel_worker,
+            args=(i, shm.name, shape, episodes, use_feedback, seeds[i], sync_every, barrier, returns_queue,
+                  max_episode_steps),
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    tables = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        tables.fill(0.0)
+        for p in procs:
+            p.start()
+        finished = 0
+        while finished < workers:
+            try:
+                worker_id, ep, ep_return = returns_queue.get(timeout=1.0)
+            except queue_mod.Empty:
+                failed = [p for p in procs if p.exitcode not in (None, 0)]
+                if failed:
+                    if barrier is not None:
+                        barrier.abort()
+                    raise RuntimeError(f"Training worker exited with code {failed[0].exitcode}")
+                continue
+            if ep < 0:  # worker finished; payload is its step count
+                steps_done[worker_id] = int(ep_return)
+                finished += 1
+                continue
+            returns[worker_id].append(ep_return)
+            if on_return is not None:
+                on_return(worker_id, ep, ep_return)
+        for p in procs:
+            p.join()
+
+        agents = []
+        for i in range(workers):
+            agent = QLearningAgent(shape[1], shape[2], QLearningConfig())
+            agent.q_table = tables[i].copy()  # the shared buffer is released below
+            agent._steps_done = steps_done[i]
+            agents.append(agent)
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        del tables  # release the buffer export before closing
+        shm.close()
+        shm.unlink()
+    return agents, returns
+
+
+def _parallel_worker(worker_id, shm_name, shape, episodes, use_feedback, seed, sync_every, barrier, returns_queue,
+                     max_episode_steps) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tables = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    try:
+        env = GridWorldEnv(max_episode_steps=max_episode_steps or None)
+        rng = np.random.default_rng(seed)
+        np.random.seed(seed)
+        agent = QLearningAgent(shape[1], shape[2], QLearningConfig())
+        agent.q_table = tables[worker_id]  # train in place in shared memory
+
+        feedback_mgr = None
+        if use_feedback:
+            feedback_mgr = FeedbackManager(FeedbackConfig(file_path=Path("data/feedback/gridworld_feedback.json")))
+
+        scratch = tables[-1]
+        for ep in range(episodes):
+            state, _ = env.reset(seed=rng.integers(0, 1_000_000))
+            returns_queue.put((worker_id, ep, run_episode(env, agent, state, feedback_mgr)))
+            if barrier is not None and (ep + 1) % sync_every == 0:
+                barrier.wait()
+                if worker_id == 0:
+                    np.mean(tables[:-1], axis=0, out=scratch)
+                barrier.wait()
+                tables[worker_id][:] = scratch  # the agent's table is this shared-memory view
+        returns_queue.put((worker_id, -1, float(agent._steps_done)))
+        del scratch, agent
+    finally:
+        del tables
+        shm.close()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--episodes", type=int, default=200)
     parser.add_argument("--use_feedback", type=int, default=0)
     parser.add_argument("--render", type=int, default=0)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--num_envs", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sync_every", type=int, default=0, help="episodes between Q-table averaging (0: independent)")
+    parser.add_argument("--q_backend", type=str, default="dense", choices=["dense", "blocked", "hash"],
+                        help="Q-table storage (parallel workers always use dense shared memory)")
+    parser.add_argument("--checkpoint", type=str, default=None, help="save the agent to this checkpoint file")
+    parser.add_argument("--checkpoint_every", type=int, default=None,
+                        help="episodes between checkpoints (default 100; 0: only at the end; not with --num_envs)")
+    parser.add_argument("--resume", type=str, default=None, help="warm start from a checkpoint file (single env only)")
+    parser.add_argument("--max_episode_steps", type=int, default=DEFAULT_MAX_EPISODE_STEPS,
+                        help="truncate episodes after this many steps (0: unlimited)")
+    parser.add_argument("--eval_every", type=int, default=0,
+                        help="episodes between greedy-policy evaluations from every start state (0: off)")
+    parser.add_argument("--profile", action="store_true", help="print a per-phase timing and allocation breakdown (not with --workers)")
+    parser.add_argument("--profile_allocations", action="store_true", help="with --profile: trace allocation sites (slower)")
+    parser.add_argument("--profile_output", type=str, default=None, help="with --profile: also write the profile as JSON")
     args = parser.parse_args()
+    if args.workers > 1:
+        unsupported = [flag for flag, value in (("--checkpoint", args.checkpoint), ("--checkpoint_every", args.checkpoint_every),
+                                                ("--resume", args.resume), ("--profile", args.profile),
+                                                ("--eval_every", args.eval_every)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --workers > 1")
+    elif args.num_envs > 1:
+        unsupported = [flag for flag, value in (("--checkpoint_every", args.checkpoint_every is not None),
+                                                ("--resume", args.resume)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --num_envs > 1 "
+                         "(--checkpoint saves once at the end)")
+    profiler = maybe_profiler(args.profile, args.profile_allocations)
+
+    def on_eval(ep, report) -> None:
+        print(f"[eval] episode {ep}: {report.summary()}")
 
-    agent, returns = run_training(args.episodes, bool(args.use_feedback), bool(args.render), args.seed)
+    if args.workers > 1:
+        agents, per_worker = run_parallel_training(
+            args.episodes, bool(args.use_feedback), args.seed, args.workers, args.sync_every,
+            on_return=lambda w, ep, r: print(f"[worker {w}] episode {ep + 1}: return {r:.2f}") if (ep + 1) % 50 == 0 else None,
+            max_episode_steps=args.max_episode_steps,
+        )
+        tails = [np.mean(r[-50:]) for r in per_worker]
+        print(f"Training finished on {args.workers} workers. Mean return(last 50): {np.mean(tails):.2f} ± {np.std(tails):.2f}")
+        return
+    if args.num_envs > 1:
+        agent, returns = run_vector_training(args.episodes, bool(args.use_feedback), args.seed, args.num_envs, args.q_backend,
+                                             profiler=profiler, eval_every=args.eval_every, on_eval=on_eval,
+                                             max_episode_steps=args.max_episode_steps)
+        if args.checkpoint:
+            save_checkpoint(agent, args.checkpoint)
+    else:
+        agent, returns = run_training(
+            args.episodes, bool(args.use_feedback), bool(args.render), args.seed, args.q_backend,
+            checkpoint_path=args.checkpoint, resume_from=args.resume,
+            checkpoint_every=100 if args.checkpoint_every is None else args.checkpoint_every,
+            profiler=profiler, eval_every=args.eval_every, on_eval=on_eval,
+            max_episode_steps=args.max_episode_steps,
+        )
     print(f"Training finished. Mean return(last 50): {np.mean(returns[-50:]) if len(returns)>=50 else np.mean(returns):.2f}")
+    if args.q_backend != "dense":
+        mem = agent.memory_usage()
+        print(f"Q-table ({mem['backend']}): {mem['bytes'] / 1024:.1f} KiB for {int(mem['stored_states'])} states "
+              f"({mem['fraction_of_dense']:.1%} of dense)")
+    if profiler is not None:
+        print(profiler.stop().report())
+        if args.profile_output:
+            Path(args.profile_output).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.profile_output).write_text(json.dumps(profiler.to_dict(), indent=2))
 
 
 if __name__ == "__main__":